@@ -6,4 +6,4 @@ __author__ = """Michael Galloy"""
 __email__ = "mgalloy@gmail.com"
 __version__ = "0.2.0"
 
-from .configparser import EpochConfigParser, ConfigParser  # noqa: F401
+from .configparser import EpochConfigParser, ConfigParser, collect_stats  # noqa: F401
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""Helpers for the coroutine variants of the blocking functions of epochs, i.e.,
+``ConfigParser.aread``, ``EpochConfigParser.aread``, ``timeline.aload``, and
+``timeline.arender``.
+
+The blocking file I/O and CPU work of these coroutines runs in an executor, so
+it never blocks the event loop. By default, this is the default executor of the
+running loop, but another executor can be set with ``set_executor``. Reading
+config files updates the parser in the worker, so it needs a thread pool, while
+rendering timelines can also use a process pool.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+
+
+# executor used when none is given, None for the default executor of the loop
+_executor = None
+
+# futures of the loads in progress by event loop and key
+_in_flight = {}
+
+
+def set_executor(executor: concurrent.futures.Executor) -> None:
+    """Set the executor for the blocking work of the coroutines of epochs.
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor
+        executor to use, or ``None`` to use the default executor of the running
+        event loop
+    """
+    global _executor
+    _executor = executor
+
+
+async def run(func, *args, executor: concurrent.futures.Executor = None, **kwargs):
+    """Call a blocking function in an executor and wait for its result.
+
+    Parameters
+    ----------
+    func : callable
+        function to call
+    executor : concurrent.futures.Executor
+        executor to use, defaults to the one set by ``set_executor``
+    """
+    loop = asyncio.get_running_loop()
+    executor = _executor if executor is None else executor
+    return await loop.run_in_executor(
+        executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+async def coalesce(key, func, *args, **kwargs):
+    """Call a blocking function in an executor, unless a call with the same key is
+    already in progress, in which case its result is awaited instead. Callers
+    coalesced into one call share its result.
+
+    Parameters
+    ----------
+    key : hashable
+        key identifying the call, e.g., the filename of a load
+    func : callable
+        function to call, see ``run``
+    """
+    loop = asyncio.get_running_loop()
+    in_flight_key = (loop, key)
+    future = _in_flight.get(in_flight_key)
+    if future is None:
+        future = asyncio.ensure_future(run(func, *args, **kwargs))
+        _in_flight[in_flight_key] = future
+        future.add_done_callback(lambda f: _in_flight.pop(in_flight_key, None))
+
+    # a cancelled caller should not cancel the load for the other callers
+    return await asyncio.shield(future)
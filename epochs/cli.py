@@ -1,39 +1,328 @@
 # -*- coding: utf-8 -*-
 
 import argparse
-import configparser
+import csv
+import functools
+import io
+import json
+import sys
 
 import epochs
+from epochs import store
 
 
-def main():
-    name = f"Epochs utility (epochs {epochs.__version__})"
-    parser = argparse.ArgumentParser(description=name)
-    parser.add_argument("-v", "--version", action="version", version=name)
-    parser.add_argument("filename", help="epochs config filename")
-    parser.add_argument("-o", "--option", help="trace the change of an option value")
-    parser.add_argument("--verbose", help="output warnings", action="store_true")
-    args = parser.parse_args()
+FIELDS = ["epoch", "date", "option", "value"]
+
+
+def _format_value(value):
+    if isinstance(value, list):
+        return "[" + ", ".join(str(v) for v in value) + "]"
+    return str(value)
+
+
+def trace_records(ep, options):
+    for e_dt, e_name, o, v in ep.trace(options):
+        yield {"epoch": e_name, "date": e_dt.isoformat(), "option": o, "value": v}
 
-    cp = configparser.ConfigParser()
-    cp.read(args.filename)
 
-    options = args.option.split(",")
+def value_records(ep, date, options):
+    for o, v in ep.get_all(date, options=options).items():
+        yield {"epoch": None, "date": date.isoformat(), "option": o, "value": v}
 
+
+def write_text(records, f):
     first_section = True
-    use_section = False
-    for s in cp.sections():
-        for o in options:
-            if o in cp.options(s):
-                use_section = True
-        if use_section:
+    current_section = None
+    for r in records:
+        if r["epoch"] is not None and r["epoch"] != current_section:
             if not first_section:
-                print()
+                f.write("\n")
             else:
                 first_section = False
-            print(f"[{s}]")
-            for o in options:
-                if o in cp.options(s):
-                    v = cp.get(s, o)
-                    print(f"{o}: {v}")
-        use_section = False
+            f.write(f"[{r['epoch']}]\n")
+            current_section = r["epoch"]
+        f.write(f"{r['option']}: {_format_value(r['value'])}\n")
+
+
+def write_json(records, f):
+    encoder = json.JSONEncoder(ensure_ascii=False)
+    separator = "[\n"
+    for r in records:
+        f.write(separator)
+        f.write(encoder.encode(r))
+        separator = ",\n"
+    f.write("[]\n" if separator == "[\n" else "\n]\n")
+
+
+def write_ndjson(records, f):
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for r in records:
+        f.write(encoder.encode(r))
+        f.write("\n")
+
+
+def _format_csv_value(value):
+    # an empty field for a missing value, which str would write as "None"
+    return "" if value is None else _format_value(value)
+
+
+def write_csv(records, f, fields=FIELDS):
+    writer = csv.writer(f, lineterminator="\n")
+    writer.writerow(fields)
+    for r in records:
+        writer.writerow(
+            [_format_csv_value(r[k]) if k.endswith("value") else r[k] for k in fields]
+        )
+
+
+WRITERS = {
+    "text": write_text,
+    "json": write_json,
+    "ndjson": write_ndjson,
+    "csv": write_csv,
+}
+
+DIFF_FIELDS = ["option", "start", "end", "value", "other_value"]
+DATE_DIFF_FIELDS = ["option", "date", "value", "other_date", "other_value"]
+
+
+def difference_records(ep, other, options):
+    for d in ep.diff(other, options):
+        yield {
+            "option": d.option,
+            "start": None if d.start is None else d.start.isoformat(),
+            "end": None if d.end is None else d.end.isoformat(),
+            "value": d.value,
+            "other_value": d.other_value,
+        }
+
+
+def date_difference_records(ep, date, other_date, options):
+    for o, (v, other_v) in ep.diff_dates(date, other_date, options).items():
+        yield {
+            "option": o,
+            "date": date.isoformat(),
+            "value": v,
+            "other_date": other_date.isoformat(),
+            "other_value": other_v,
+        }
+
+
+def write_difference_text(records, f):
+    current_option = None
+    for r in records:
+        if r["option"] != current_option:
+            if current_option is not None:
+                f.write("\n")
+            f.write(f"[{r['option']}]\n")
+            current_option = r["option"]
+        start = "..." if r["start"] is None else r["start"]
+        end = "..." if r["end"] is None else r["end"]
+        value = _format_value(r["value"])
+        other_value = _format_value(r["other_value"])
+        f.write(f"{start} to {end}: {value} -> {other_value}\n")
+
+
+def write_date_difference_text(records, f):
+    for r in records:
+        value = _format_value(r["value"])
+        other_value = _format_value(r["other_value"])
+        f.write(f"{r['option']}: {value} -> {other_value}\n")
+
+
+def _add_common_arguments(parser):
+    parser.add_argument("-s", "--spec", help="specification filename")
+    parser.add_argument(
+        "--formats",
+        help="comma separated formats of the section dates, e.g., %%Y%%m%%d",
+    )
+    parser.add_argument(
+        "--timezone",
+        help="time zone of the section dates, e.g., HST; dates are then shown in "
+        "UTC, and dates given without a UTC offset are in this time zone",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        help="output format, default is text",
+        choices=list(WRITERS),
+        default="text",
+    )
+    parser.add_argument("--verbose", help="output warnings", action="store_true")
+
+
+def _read(parser, args, filename):
+    ep = epochs.EpochConfigParser(args.spec)
+    if args.formats is not None:
+        ep.formats = args.formats.split(",")
+    if args.timezone is not None:
+        try:
+            ep.timezone = args.timezone
+        except ValueError as e:
+            parser.error(str(e))
+    if store.is_store(filename):
+        try:
+            ep.open_store(filename)
+        except ValueError as e:
+            parser.error(str(e))
+        return ep
+    if not ep.read(filename):
+        parser.error(f"file not found: {filename}")
+    try:
+        ep.view.epochs  # raises if the section dates do not match the formats
+    except (ValueError, TypeError) as e:
+        parser.error(f"invalid section date in {filename}: {e}")
+
+    if args.verbose and args.spec is not None and not ep.is_valid():
+        print(f"WARNING: {filename} does not match its specification")
+
+    return ep
+
+
+def _write(parser, write, records):
+    # write records through one large buffer instead of a print per line
+    sys.stdout.flush()
+    stdout_buffer = getattr(sys.stdout, "buffer", None)
+    if stdout_buffer is None:
+        # a text stream, e.g., redirected to an io.StringIO
+        out = sys.stdout
+    else:
+        out = io.TextIOWrapper(
+            io.BufferedWriter(stdout_buffer, buffer_size=2**16), encoding="utf-8"
+        )
+    try:
+        write(records, out)
+    except ValueError as e:
+        out.flush()
+        parser.error(str(e))
+    finally:
+        out.flush()
+        if out is not sys.stdout:
+            # leave sys.stdout open
+            out.detach().detach()
+
+
+def _parse_date(parser, ep, date):
+    try:
+        return ep.view.parse_datetime(date)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+def diff_main(argv):
+    name = f"Epochs utility (epochs {epochs.__version__})"
+    parser = argparse.ArgumentParser(
+        prog="epochs diff",
+        description=f"{name}: compare the values of options in two epochs files, or "
+        "in one epochs file at two dates",
+    )
+    parser.add_argument("filenames", help="epochs config filename(s)", nargs="+")
+    parser.add_argument(
+        "-o", "--option", help="compare an option value, default is all options"
+    )
+    parser.add_argument(
+        "-d",
+        "--date",
+        help="date to compare, given twice when comparing a single file",
+        action="append",
+    )
+    _add_common_arguments(parser)
+    args = parser.parse_args(argv)
+
+    options = None if args.option is None else args.option.split(",")
+
+    if len(args.filenames) == 2 and args.date is None:
+        ep = _read(parser, args, args.filenames[0])
+        other = _read(parser, args, args.filenames[1])
+        records = difference_records(ep, other, options)
+        text_writer = write_difference_text
+        fields = DIFF_FIELDS
+    elif len(args.filenames) == 1 and args.date is not None and len(args.date) == 2:
+        ep = _read(parser, args, args.filenames[0])
+        date, other_date = (_parse_date(parser, ep, d) for d in args.date)
+        records = date_difference_records(ep, date, other_date, options)
+        text_writer = write_date_difference_text
+        fields = DATE_DIFF_FIELDS
+    else:
+        parser.error("specify two files, or one file and two dates")
+
+    if args.format == "text":
+        write = text_writer
+    elif args.format == "csv":
+        write = functools.partial(write_csv, fields=fields)
+    else:
+        write = WRITERS[args.format]
+    _write(parser, write, records)
+
+
+def convert_main(argv):
+    name = f"Epochs utility (epochs {epochs.__version__})"
+    parser = argparse.ArgumentParser(
+        prog="epochs convert",
+        description=f"{name}: convert an epochs config file to a compact store "
+        "that is memory-mapped instead of parsed when read",
+    )
+    parser.add_argument("filename", help="epochs config filename")
+    parser.add_argument("output", help="store filename")
+    parser.add_argument(
+        "--formats",
+        help="comma separated formats of the section dates, e.g., %%Y%%m%%d",
+    )
+    parser.add_argument(
+        "--timezone",
+        help="time zone of the section dates, e.g., HST; the store then keeps "
+        "dates in UTC",
+    )
+    args = parser.parse_args(argv)
+
+    ep = epochs.EpochConfigParser()
+    if args.formats is not None:
+        ep.formats = args.formats.split(",")
+    if args.timezone is not None:
+        try:
+            ep.timezone = args.timezone
+        except ValueError as e:
+            parser.error(str(e))
+    if not ep.read(args.filename):
+        parser.error(f"file not found: {args.filename}")
+
+    try:
+        store.write_store(ep.view, args.output)
+    except ValueError as e:
+        parser.error(str(e))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["diff"]:
+        return diff_main(argv[1:])
+    if argv[:1] == ["convert"]:
+        return convert_main(argv[1:])
+
+    name = f"Epochs utility (epochs {epochs.__version__})"
+    parser = argparse.ArgumentParser(
+        description=name,
+        epilog="use `epochs diff -h` to compare epochs files and `epochs convert -h` "
+        "to convert them to stores",
+    )
+    parser.add_argument("-v", "--version", action="version", version=name)
+    parser.add_argument("filename", help="epochs config filename")
+    parser.add_argument(
+        "-o",
+        "--option",
+        help="trace the change of an option value, default is all options",
+    )
+    parser.add_argument("-d", "--date", help="show the option values at a date")
+    _add_common_arguments(parser)
+    args = parser.parse_args(argv)
+
+    ep = _read(parser, args, args.filename)
+
+    options = None if args.option is None else args.option.split(",")
+
+    if args.date is None:
+        records = trace_records(ep, options)
+    else:
+        date = _parse_date(parser, ep, args.date)
+        records = value_records(ep, date, options)
+    _write(parser, WRITERS[args.format], records)
@@ -7,16 +7,25 @@ The ``EpochParser`` is a parser which organizes options by date. An option
 value is found by matching the option in the section with the latest datetime
 before the given datetime."""
 
+import array
+import bisect
 import collections
 import configparser
+import contextlib
+import copy
 import datetime
+import heapq
 import io
+import itertools
 import os
 import re
+import sys
+import threading
+import time
 from typing import List, TypeVar, TextIO
 
 import dateutil.parser
-
+import dateutil.tz
 
 OptionValue = TypeVar(
     "OptionValue", bool, float, int, str, List[bool], List[float], List[int], List[str]
@@ -27,11 +36,94 @@ FileType = TypeVar("FileType", str, TextIO)
 OptionSpec = collections.namedtuple("OptionSpec", "required type default list")
 OptionSpec.__doc__ = """Specification for an option"""
 
+# used for options without a specification
+UNSPECIFIED = OptionSpec(required=False, type=str, default=None, list=False)
+
+OptionDifference = collections.namedtuple(
+    "OptionDifference", "option start end value other_value"
+)
+OptionDifference.__doc__ = """Interval where the value of an option differs between
+two epoch files, ``start`` is ``None`` for a difference from the beginning of
+time and ``end`` is ``None`` if the difference never ends"""
+
 TYPES = {"bool": bool, "boolean": bool, "float": float, "int": int, "str": str}
 
 identifier_re = re.compile('[^,="]')
 whitespace_re = re.compile(r"\s")
 listtypes_re = re.compile(r"List\[(.*)\]")
+reference_re = re.compile(r"%\(([^)]+)\)s")
+
+
+class AccessStats:
+    """Counts and cumulative times of option lookups and conversions, hits and
+    misses of caches, and timings of reading config files.
+    """
+
+    def __init__(self) -> None:
+        self.calls = collections.defaultdict(collections.Counter)
+        self.times = collections.defaultdict(collections.Counter)
+        self.hits = collections.Counter()
+        self.misses = collections.Counter()
+        self.reads = []
+
+    def record_call(self, function: str, key: str, elapsed: float) -> None:
+        self.calls[function][key] += 1
+        self.times[function][key] += elapsed
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        if hit:
+            self.hits[cache] += 1
+        else:
+            self.misses[cache] += 1
+
+    def record_read(self, kind: str, filenames, elapsed: float) -> None:
+        if isinstance(filenames, (str, os.PathLike)):
+            filenames = [filenames]
+        self.reads.append(
+            {"kind": kind, "filenames": [str(f) for f in filenames], "time": elapsed}
+        )
+
+    def as_dict(self) -> dict:
+        """Statistics as a dict with "calls", "caches", and "reads" items."""
+        calls = {
+            function: {
+                k: {"count": counts[k], "time": self.times[function][k]} for k in counts
+            }
+            for function, counts in self.calls.items()
+        }
+        caches = {}
+        for cache in set(self.hits) | set(self.misses):
+            hits, misses = self.hits[cache], self.misses[cache]
+            caches[cache] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses),
+            }
+        return {"calls": calls, "caches": caches, "reads": list(self.reads)}
+
+
+# statistics currently being collected, if any
+_stats = None
+
+
+@contextlib.contextmanager
+def collect_stats():
+    """Context manager collecting ``AccessStats`` of all config parsers inside
+    the ``with`` block. Outside of it, the only cost of the instrumentation is
+    a check of a global variable.
+
+    Yields
+    ------
+    AccessStats
+    """
+    global _stats
+    previous = _stats
+    stats = AccessStats()
+    _stats = stats
+    try:
+        yield stats
+    finally:
+        _stats = previous
 
 
 def _parse_specline_tokens(specline: str) -> OptionSpec:
@@ -123,8 +215,23 @@ def _convert(value: str, type_value: type, is_list: bool = False) -> OptionValue
     -------
     scalar or List with same type as type_value
     """
+    stats = _stats
+    if stats is None:
+        return _convert_value(value, type_value, is_list)
+
+    t0 = time.perf_counter()
+    try:
+        return _convert_value(value, type_value, is_list)
+    finally:
+        key = f"List[{type_value.__name__}]" if is_list else type_value.__name__
+        stats.record_call("_convert", key, time.perf_counter() - t0)
+
+
+def _convert_value(value: str, type_value: type, is_list: bool) -> OptionValue:
     if is_list:
-        return [_convert(v, type_value, False) for v in _parse_list(value) if v != ""]
+        return [
+            _convert_value(v, type_value, False) for v in _parse_list(value) if v != ""
+        ]
     else:
         if type_value == bool:
             if value.lower() in {"yes", "true", "1"}:
@@ -137,6 +244,88 @@ def _convert(value: str, type_value: type, is_list: bool = False) -> OptionValue
             return type_value(value)
 
 
+def _get_timezone(timezone) -> datetime.tzinfo:
+    """Time zone given by a name, e.g., "Pacific/Honolulu" or "HST", or a
+    ``datetime.tzinfo``.
+    """
+    if timezone is None or isinstance(timezone, datetime.tzinfo):
+        return timezone
+    tz = dateutil.tz.gettz(timezone)
+    if tz is None:
+        raise ValueError(f"unknown time zone: {timezone}")
+    return tz
+
+
+class _Unresolved:
+    """Value of an option that could not be interpolated or converted when a view
+    was built, the error is raised when the value is accessed.
+    """
+
+    __slots__ = ["error"]
+
+    def __init__(self, error: Exception) -> None:
+        self.error = error
+
+
+def _value(value) -> OptionValue:
+    """Value to return for a resolved value of a view, lists are copied so
+    callers can not modify the view.
+    """
+    if type(value) is list:
+        return list(value)
+    if type(value) is _Unresolved:
+        raise value.error
+    return value
+
+
+def _dependents(config: "ConfigParser", section: str, option: str):
+    """Options of a section whose interpolated values depend on an option, i.e.,
+    the option and the options referring to it, directly or indirectly. Returns
+    ``None`` if the dependencies can not be found for the interpolation of the
+    config.
+    """
+    interpolation = config._interpolation
+    if type(interpolation) is configparser.Interpolation:
+        return {option}
+    if not isinstance(interpolation, configparser.BasicInterpolation):
+        return None
+
+    referrers = collections.defaultdict(set)
+    for o, raw in config.items(section, raw=True):
+        for name in reference_re.findall(raw):
+            referrers[config.optionxform(name)].add(o)
+
+    dependents = {option}
+    stack = [option]
+    while stack:
+        for o in referrers[stack.pop()]:
+            if o not in dependents:
+                dependents.add(o)
+                stack.append(o)
+    return dependents
+
+
+def _sizeof(value) -> int:
+    """Approximate size in bytes of a value, 0 for the objects Python already
+    shares, e.g., ``None``, booleans, small integers, and one character strings.
+    """
+    if value is None or type(value) is bool:
+        return 0
+    if type(value) is int and -5 <= value <= 256:
+        return 0
+    if type(value) is str and len(value) <= 1 and value <= "\xff":
+        return 0
+    if type(value) is list:
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _filenames_key(filenames) -> tuple:
+    if isinstance(filenames, (str, bytes, os.PathLike)):
+        filenames = [filenames]
+    return tuple(os.path.abspath(f) for f in filenames)
+
+
 def _parse_specline(specline: str) -> OptionSpec:
     """Parse a spec line
 
@@ -190,6 +379,11 @@ def _parse_specline(specline: str) -> OptionSpec:
     return OptionSpec(required=required, type=type_value, default=default, list=is_list)
 
 
+# lock for the reads of ``ConfigParser.aread``, one for all parsers since a
+# parser is copied with ``copy.deepcopy``, which can not copy a lock
+_read_lock = threading.Lock()
+
+
 class ConfigParser(configparser.ConfigParser):
     """ConfigParser subclass which can verify a config file against a
     specification and uses types/defaults from the specification.
@@ -216,6 +410,10 @@ class ConfigParser(configparser.ConfigParser):
             self.specification = configparser.ConfigParser()
             self.specification.read(spec_filename)
 
+    def optionxform(self, optionstr: str) -> str:
+        # option names repeat in every section, so share a single string
+        return sys.intern(super().optionxform(optionstr))
+
     def get(
         self,
         section: str,
@@ -237,6 +435,19 @@ class ConfigParser(configparser.ConfigParser):
         use_spec : bool
             set to False to not use the specification
         """
+        stats = _stats
+        if stats is None:
+            return self._get_option(section, option, raw, use_spec, **kwargs)
+
+        t0 = time.perf_counter()
+        try:
+            return self._get_option(section, option, raw, use_spec, **kwargs)
+        finally:
+            stats.record_call("ConfigParser.get", option, time.perf_counter() - t0)
+
+    def _get_option(
+        self, section: str, option: str, raw: bool, use_spec: bool, **kwargs
+    ) -> OptionValue:
         if self.specification is None or use_spec is False:
             return super().get(section, option, raw=raw, **kwargs)
 
@@ -287,7 +498,9 @@ class ConfigParser(configparser.ConfigParser):
                 fileobject.write(f"{o:{max_len}s} = {v}\n")
 
     def read(self, filenames, encoding=None):
+        t0 = time.perf_counter()
         read_ok = super().read(filenames, encoding=encoding)
+        self._share_values()
         if self.parent_option is not None:
             parent_section, parent_option = self.parent_option.split("/")
             if self.has_option(parent_section, parent_option):
@@ -301,8 +514,38 @@ class ConfigParser(configparser.ConfigParser):
                     )
                     self.parent.read(parent_path)
 
+        if _stats is not None:
+            _stats.record_read("ConfigParser", filenames, time.perf_counter() - t0)
+
         return read_ok
 
+    def _share_values(self) -> None:
+        """Share a single string between the identical raw values of different
+        sections, since epochs often repeat the values of earlier epochs.
+        """
+        shared = {}
+        for values in itertools.chain([self._defaults], self._sections.values()):
+            for o, v in values.items():
+                if type(v) is str:
+                    values[o] = shared.setdefault(v, v)
+
+    async def aread(self, filenames, encoding=None, executor=None):
+        """Coroutine version of ``read``, reading and parsing the files in an
+        executor, see ``epochs.aio``. Concurrent reads of the same files by the
+        parser are coalesced into a single read, while reads of different files
+        run one at a time, since a ``ConfigParser`` is not thread-safe.
+        """
+        from . import aio
+
+        key = ("read", id(self), _filenames_key(filenames), encoding)
+        return await aio.coalesce(
+            key, self._serialized_read, filenames, encoding=encoding, executor=executor
+        )
+
+    def _serialized_read(self, filenames, encoding=None):
+        with _read_lock:
+            return self.read(filenames, encoding=encoding)
+
     def write(self, file: FileType, space_around_delimiters: bool = True) -> None:
         """Write config file to a file-like object
 
@@ -362,18 +605,532 @@ class ConfigParser(configparser.ConfigParser):
         return True
 
 
+class EpochView:
+    """Immutable compiled view of the epochs of an ``EpochConfigParser``.
+
+    The epochs are parsed and sorted by date along with the parsed
+    specification of each option, and for each option, the dates and names of
+    the epochs setting it are kept in sorted lists for bisection. The value of
+    each option set by an epoch is interpolated and converted to its type once,
+    when the view is built, so lookups never interpolate or convert values.
+    Identical values of the same type are converted once and shared between
+    epochs, see ``memory_stats``. A
+    view, and the config it was built from, is never modified after it is
+    created, so it can be used from several threads without locking.
+
+    With a `timezone`, epoch dates are converted to aware UTC datetimes once,
+    when the view is built. Naive query dates are then in the time zone of the
+    epochs, while aware query dates are compared to the epochs as they are.
+    """
+
+    def __init__(
+        self, config: ConfigParser, specs: dict, formats=None, timezone=None
+    ) -> None:
+        self.config = config
+        # without a specification file, options are unspecified strings
+        self._unspecified = specs is None
+        self.specs = {} if specs is None else specs
+        self.formats = None if formats is None else tuple(formats)
+        self.timezone = timezone
+        self._tz = _get_timezone(timezone)
+
+        epochs = [(self._epoch_datetime(s), s) for s in config.sections()]
+        epochs.sort(key=lambda e: e[0])
+        self.epochs = epochs
+
+        # resolved values of the options set by each epoch, in config order, and
+        # the shared converted values by type and interpolated raw value
+        self._values = {}
+        self._converted = {}
+        self._option_epochs = {}
+        for e_dt, e_name in epochs:
+            self._values[e_name] = {
+                o: self._resolve(e_name, o) for o in config.options(e_name)
+            }
+            for o in self._values[e_name]:
+                dts, names = self._option_epochs.setdefault(o, ([], []))
+                dts.append(e_dt)
+                names.append(e_name)
+
+        # options in the specification followed by any other options
+        options = itertools.chain(self.specs, self._option_epochs)
+        self._options = list(dict.fromkeys(options))
+
+    def _resolve(self, e_name: str, option: str):
+        """Interpolated value of an option in an epoch, converted to the type of
+        the option.
+        """
+        spec = self.specs.get(option, UNSPECIFIED)
+        try:
+            key = (spec.type, spec.list, self.config.get(e_name, option))
+        except configparser.Error as e:
+            return _Unresolved(e)
+
+        hit = key in self._converted
+        if _stats is not None:
+            _stats.record_cache("values", hit)
+        if not hit:
+            try:
+                self._converted[key] = _convert(key[2], spec.type, spec.list)
+            except (ValueError, TypeError) as e:
+                self._converted[key] = _Unresolved(e)
+        return self._converted[key]
+
+    def replace(self, config: ConfigParser, section: str, option: str) -> "EpochView":
+        """New view of a config differing from the config of this view only by
+        the value of an option in a section, e.g., after setting it. Only the
+        values depending on the option, through interpolation, are resolved
+        again, the rest of the view is shared with this view.
+
+        Parameters
+        ----------
+        config : ConfigParser
+            new config, a modified copy of the config of this view
+        section : str
+            epoch section name, or the default section, of the changed option
+        option : str
+            name of the changed option
+        """
+        specs = None if self._unspecified else self.specs
+        option = config.optionxform(option)
+        if section == config.default_section:
+            sections = list(self._values)
+        elif section in self._values:
+            sections = [section]
+        else:
+            # a new epoch
+            return EpochView(config, specs, self.formats, self.timezone)
+
+        view = copy.copy(self)
+        view.config = config
+        view._values = dict(self._values)
+        view._converted = dict(self._converted)
+        added = False
+        for e_name in sections:
+            dependents = _dependents(config, e_name, option)
+            if dependents is None:
+                return EpochView(config, specs, self.formats, self.timezone)
+            values = view._values[e_name]
+            added = added or option not in values
+            values = {o: values.get(o) for o in config.options(e_name)}
+            for o in dependents.intersection(values):
+                values[o] = view._resolve(e_name, o)
+            view._values[e_name] = values
+
+        if added:
+            # the epochs setting the option changed
+            dts, names = [], []
+            for e_dt, e_name in view.epochs:
+                if option in view._values[e_name]:
+                    dts.append(e_dt)
+                    names.append(e_name)
+            view._option_epochs = {**self._option_epochs, option: (dts, names)}
+            options = itertools.chain(view.specs, view._option_epochs)
+            view._options = list(dict.fromkeys(options))
+
+        return view
+
+    def parse_datetime(self, d: DateValue) -> datetime.datetime:
+        """Parse a date given as a string or ``datetime.datetime``. If the epochs
+        have a time zone, naive dates are in that time zone and are returned as
+        aware UTC datetimes. Raises ``ValueError`` for a date matching none of the
+        formats.
+        """
+        dt = self._parse_datetime(d)
+        if self._tz is not None and dt.tzinfo is None:
+            dt = dt.replace(tzinfo=self._tz).astimezone(datetime.timezone.utc)
+        return dt
+
+    def _epoch_datetime(self, d: str) -> datetime.datetime:
+        try:
+            dt = self.parse_datetime(d)
+        except ValueError as e:
+            raise ValueError(f"invalid epoch section {d}: {e}") from None
+        if self._tz is not None:
+            # sections with an explicit UTC offset
+            dt = dt.astimezone(datetime.timezone.utc)
+        return dt
+
+    def _parse_datetime(self, d: DateValue) -> datetime.datetime:
+        if isinstance(d, datetime.datetime):
+            return d
+        else:
+            if self.formats is None:
+                return dateutil.parser.parse(d)
+            else:
+                for f in self.formats:
+                    try:
+                        dt = datetime.datetime.strptime(d, f)
+                        return dt
+                    except ValueError:
+                        pass
+                raise ValueError(f"date {d} does not match any of the formats")
+
+    def lookup(self, option: str, dt: datetime.datetime) -> str:
+        """Name of the epoch in effect for an option at a given date, ``None``
+        if no epoch before the date sets the option.
+        """
+        if option not in self._option_epochs:
+            return None
+        dts, names = self._option_epochs[option]
+        i = bisect.bisect_right(dts, dt)
+        return names[i - 1] if i > 0 else None
+
+    def next_change(self, option: str, dt: datetime.datetime) -> datetime.datetime:
+        """Date of the first epoch after `dt` setting an option, ``None`` if
+        there is no such epoch.
+        """
+        if option not in self._option_epochs:
+            return None
+        dts, names = self._option_epochs[option]
+        i = bisect.bisect_right(dts, dt)
+        return dts[i] if i < len(dts) else None
+
+    def _epoch_dates(self):
+        """Sorted sequence of the epoch dates to bisect, and a function converting
+        a date to an item of the sequence.
+        """
+        return [e_dt for e_dt, e_name in self.epochs], lambda dt: dt
+
+    def memory_stats(self) -> dict:
+        """Number of option values of the epochs and memory saved by sharing
+        option names, raw values, and converted values between epochs, compared
+        to keeping a separate copy of each in every epoch. Objects Python shares
+        anyway, e.g., small integers, are not counted.
+
+        Returns
+        -------
+        dict
+            "values" and "unique_values" counts and approximate "bytes_saved"
+        """
+        config = self.config
+        sections = [config._sections[e_name] for e_name in self._values]
+
+        # sizes of the objects kept by id, and the size without any sharing
+        kept = {}
+        unshared = 0
+        for raw_values in [config._defaults] + sections:
+            for obj in itertools.chain.from_iterable(raw_values.items()):
+                size = _sizeof(obj)
+                kept[id(obj)] = size
+                unshared += size
+
+        values = set()
+        for raw_values, epoch_values in zip(sections, self._values.values()):
+            for o, v in epoch_values.items():
+                values.add(id(v))
+                raw = raw_values.get(o, config._defaults.get(o))
+                if v is not raw:
+                    # converted, so a copy in each epoch without sharing
+                    size = _sizeof(v)
+                    kept[id(v)] = size
+                    unshared += size
+
+        return {
+            "values": sum(len(v) for v in self._values.values()),
+            "unique_values": len(values),
+            "bytes_saved": unshared - sum(kept.values()),
+        }
+
+    def option_spec(self, option: str) -> OptionSpec:
+        if self._unspecified:
+            return UNSPECIFIED
+        return self.specs[option]
+
+    def options(self) -> List[str]:
+        """Names of all options, i.e., the options in the specification followed
+        by any other options set in an epoch.
+        """
+        return list(self._options)
+
+    def get(self, option: str, date: DateValue) -> OptionValue:
+        """Get the value of an option at a given date."""
+        dt = self.parse_datetime(date)
+        spec = self.option_spec(option)
+
+        e_name = self.lookup(option, dt)
+        if e_name is None:
+            return spec.default
+        return _value(self._values[e_name][option])
+
+    def get_all(self, date: DateValue, options: List[str] = None) -> dict:
+        """Get the values of several options at a given date, see
+        ``EpochConfigParser.get_all``.
+        """
+        dt = self.parse_datetime(date)
+        options = self._options if options is None else options
+        specs = {o: self.specs.get(o, UNSPECIFIED) for o in options}
+
+        values = {o: s.default for o, s in specs.items()}
+        for e_dt, e_name in self.epochs:
+            if e_dt > dt:
+                break
+            for o, v in self._values[e_name].items():
+                if o in values:
+                    values[o] = v
+
+        return {o: _value(v) for o, v in values.items()}
+
+    def trace(self, options: List[str] = None):
+        """Generate the changes of option values over time, see
+        ``EpochConfigParser.trace``.
+        """
+        options = self._options if options is None else options
+        specs = {o: self.specs.get(o, UNSPECIFIED) for o in options}
+        values = {o: s.default for o, s in specs.items()}
+
+        for e_dt, e_name in self.epochs:
+            for o, v in self._values[e_name].items():
+                if o not in values:
+                    continue
+                v = _value(v)
+                if v != values[o]:
+                    values[o] = v
+                    yield e_dt, e_name, o, v
+
+    def columns(self, options: List[str] = None):
+        """Values of options at each epoch in a single pass over the epochs,
+        carrying values forward from earlier epochs.
+
+        Returns
+        -------
+        tuple
+            list of epoch dates and dict of the list of values of each option
+        """
+        options = self._options if options is None else options
+        specs = {o: self.specs.get(o, UNSPECIFIED) for o in options}
+        values = {o: s.default for o, s in specs.items()}
+        columns = {o: [] for o in options}
+
+        dates = []
+        for e_dt, e_name in self.epochs:
+            for o, v in self._values[e_name].items():
+                if o in values:
+                    values[o] = _value(v)
+            dates.append(e_dt)
+            for o, column in columns.items():
+                column.append(values[o])
+
+        return dates, columns
+
+
+# NumPy and Arrow types of option types
+NUMPY_TYPES = {bool: "?", int: "i8", float: "f8", str: "U"}
+ARROW_TYPES = {bool: "bool_", int: "int64", float: "float64", str: "string"}
+
+
+def _numpy_table(dates, columns: dict, specs: dict):
+    import numpy as np
+
+    dtypes = [("epoch", "datetime64[us]")]
+    fill_values = []
+    for o, values in columns.items():
+        spec = specs.get(o, UNSPECIFIED)
+        if spec.list:
+            dtype = object
+        elif spec.type == str:
+            width = max((len(v) for v in values if v is not None), default=1)
+            dtype = f"U{max(width, 1)}"
+        else:
+            dtype = NUMPY_TYPES[spec.type]
+        dtypes.append((o, dtype))
+        fill_values.append(None if spec.list else np.zeros((), dtype=dtype).item())
+
+    table = np.ma.empty(len(dates), dtype=dtypes)
+    # NumPy dates are naive, aware epoch dates are in UTC
+    dates = [d.replace(tzinfo=None) for d in dates]
+    table["epoch"] = np.array(dates, dtype="datetime64[us]")
+    table["epoch"].mask = False
+    for (o, values), fill_value in zip(columns.items(), fill_values):
+        mask = [v is None for v in values]
+        table[o] = [fill_value if m else v for v, m in zip(values, mask)]
+        table[o].mask = mask
+    return table
+
+
+def _arrow_table(dates, columns: dict, specs: dict):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("pyarrow is required for Arrow tables") from None
+
+    utc = len(dates) > 0 and dates[0].tzinfo is not None
+    arrays = [pa.array(dates, type=pa.timestamp("us", tz="UTC" if utc else None))]
+    for o, values in columns.items():
+        spec = specs.get(o, UNSPECIFIED)
+        arrow_type = getattr(pa, ARROW_TYPES[spec.type])()
+        if spec.list:
+            arrow_type = pa.list_(arrow_type)
+        arrays.append(pa.array(values, type=arrow_type))
+    return pa.Table.from_arrays(arrays, names=["epoch"] + list(columns))
+
+
+class _InvalidView:
+    """Stand-in for the view of a config whose epoch dates can not be parsed with
+    the current formats. The parsing error is raised when the view is used, so
+    the formats can still be fixed after reading.
+    """
+
+    def __init__(
+        self, config: ConfigParser, formats, timezone, error: Exception
+    ) -> None:
+        self.config = config
+        self.formats = formats
+        self.timezone = timezone
+        self._tz = _get_timezone(timezone)
+        self.error = error
+
+    parse_datetime = EpochView.parse_datetime
+    _parse_datetime = EpochView._parse_datetime
+
+    def __getattr__(self, name):
+        raise self.error
+
+
+# default limit of the number of days of a day table
+MAX_DAYS = 36600
+
+
+class _DayTable:
+    """Epoch in effect on each day of a range of days of a view, for constant
+    time lookups of dates in the range. Days are in the time zone of the epochs.
+
+    A day on which an epoch starts after midnight has no single epoch in effect,
+    so lookups on that day, like lookups outside of the range, fall back to
+    bisecting the epochs of the view. Values are looked up in the view once per
+    epoch and option, when first used.
+    """
+
+    def __init__(self, view: EpochView, start, end, max_days: int) -> None:
+        self.view = view
+        self.max_days = max_days
+        self.start = self._date(start)
+        self.end = self._date(end)
+        self._start_ordinal = self.start.toordinal()
+        n_days = (self.end - self.start).days + 1
+        if n_days < 1:
+            raise ValueError("end of day table before start")
+        if n_days > max_days:
+            raise ValueError(f"day table of {n_days} days exceeds {max_days} days")
+
+        dates, key = view._epoch_dates()
+        day_start = self._day_start(0)
+
+        # number of epochs in effect on each day, -1 if it changes during the day
+        self._positions = array.array("q", bytes(8 * n_days))
+        # values by option of each number of epochs, and a date to look them up
+        self._states = {}
+        self._state_dates = {}
+        for i in range(n_days):
+            next_day_start = self._day_start(i + 1)
+            p = bisect.bisect_right(dates, key(day_start))
+            if bisect.bisect_left(dates, key(next_day_start), lo=p) > p:
+                p = -1
+            elif p not in self._states:
+                self._states[p] = {}
+                self._state_dates[p] = day_start
+            self._positions[i] = p
+            day_start = next_day_start
+
+    def _date(self, d: DateValue) -> datetime.date:
+        if type(d) is datetime.date:
+            return d
+        dt = self.view._parse_datetime(d)
+        if dt.tzinfo is not None and self.view._tz is not None:
+            dt = dt.astimezone(self.view._tz)
+        return dt.date()
+
+    def _day_start(self, i: int) -> datetime.datetime:
+        day = self.start + datetime.timedelta(days=i)
+        return self.view.parse_datetime(datetime.datetime.combine(day, datetime.time()))
+
+    def get(self, option: str, date: DateValue) -> OptionValue:
+        """Value of an option at a date, see ``EpochView.get``."""
+        # naive dates are in the time zone of the epochs, so are already local
+        dt = self.view._parse_datetime(date)
+        tz = self.view._tz
+        if dt.tzinfo is not None and tz is None:
+            # not comparable to the epochs, let the view raise the error
+            i = -1
+        else:
+            day = dt if dt.tzinfo is None else dt.astimezone(tz)
+            i = day.toordinal() - self._start_ordinal
+        p = self._positions[i] if 0 <= i < len(self._positions) else -1
+        if _stats is not None:
+            _stats.record_cache("days", p >= 0)
+        if p < 0:
+            return self.view.get(option, dt)
+
+        state = self._states[p]
+        try:
+            value = state[option]
+        except KeyError:
+            value = state[option] = self.view.get(option, self._state_dates[p])
+        return _value(value)
+
+
 class EpochConfigParser:
     """EpochConfigParser parses config files with dates as section name. Retrieving an
     option for a given date returns the option value on the date closest, but
     before, the given date.
+
+    Lookups use an immutable ``EpochView`` compiled from the config files.
+    ``read`` and setting ``formats`` build a new config and view and then swap in
+    the new view with a single assignment, so a lookup running at the same time
+    uses either the old or the new view, never a partially read one. Changes are
+    made one at a time, holding a lock, so concurrent reads of different files
+    all end up in the config, while lookups never wait for the lock. Lookups
+    never modify the parser, so one parser can be shared between threads without
+    locks as long as dates are passed explicitly: the ``date`` property is shared
+    state meant for single-threaded use. To make several lookups against the same
+    version of the config, use the ``view`` directly. The ``config`` property is
+    a copy of the config of the current view, so change values with ``set``.
+
+    If the epochs of a file are in a given ``timezone``, epoch dates are
+    normalized to UTC when the view is built. Naive query dates are in the time
+    zone of the file, while aware query dates, e.g., in UTC, are used as given.
     """
 
     def __init__(self, spec_filename: str = None, **kwargs) -> None:
         self.spec = ConfigParser(spec_filename, **kwargs)
-        self.config = ConfigParser(**kwargs)
+        self._kwargs = kwargs
+
+        if self.spec.specification is None:
+            self._specs = None
+        else:
+            self._specs = {
+                k: _parse_specline(v)
+                for k, v in self.spec.specification.defaults().items()
+            }
 
         self._date = None
-        self._formats = None
+        self._store_filename = None
+        self._days = None
+        # held while changing the config or view, lookups do not take it
+        self._lock = threading.Lock()
+        self._view = self._build_view(ConfigParser(**kwargs), None, None)
+
+    def _build_view(self, config: ConfigParser, formats, timezone) -> EpochView:
+        t0 = time.perf_counter()
+        try:
+            view = EpochView(config, self._specs, formats, timezone)
+        except (ValueError, TypeError) as e:
+            return _InvalidView(config, formats, timezone, e)
+        if _stats is not None:
+            _stats.record_call("EpochView", "build", time.perf_counter() - t0)
+        return view
+
+    @property
+    def view(self) -> EpochView:
+        """Current immutable view of the epochs."""
+        return self._view
+
+    @property
+    def config(self) -> ConfigParser:
+        """Copy of the config of the current view. Changing the copy does not
+        change the values looked up, use ``set`` or ``read`` instead.
+        """
+        return copy.deepcopy(self._view.config)
 
     @property
     def date(self):
@@ -390,22 +1147,12 @@ class EpochConfigParser:
         self._date = self._parse_datetime(date)
 
     def _parse_datetime(self, d: DateValue) -> datetime.datetime:
-        if isinstance(d, datetime.datetime):
-            return d
-        else:
-            if self._formats is None:
-                return dateutil.parser.parse(d)
-            else:
-                for f in self._formats:
-                    try:
-                        dt = datetime.datetime.strptime(d, f)
-                        return dt
-                    except ValueError:
-                        pass
+        return self._view.parse_datetime(d)
 
     @property
     def formats(self):
-        return self._formats
+        formats = self._view.formats
+        return None if formats is None else list(formats)
 
     @formats.setter
     def formats(self, formats: List[str]):
@@ -415,13 +1162,128 @@ class EpochConfigParser:
         formats : List[str]
             formats to use for parsing dates via ``datetime.datetime.strptime``
         """
-        self._formats = formats
+        self._rebuild_view(formats, self._view.timezone)
+
+    @property
+    def timezone(self):
+        return self._view.timezone
+
+    @timezone.setter
+    def timezone(self, timezone):
+        """
+        Parameters
+        ----------
+        timezone : str or datetime.tzinfo
+            time zone of the epoch dates, e.g., "Pacific/Honolulu" or "HST", as a
+            name known to ``dateutil.tz.gettz`` or a ``datetime.tzinfo``; ``None``
+            for naive dates
+        """
+        _get_timezone(timezone)
+        self._rebuild_view(self._view.formats, timezone)
+
+    def _rebuild_view(self, formats, timezone) -> None:
+        with self._lock:
+            if self._store_filename is None:
+                self._view = self._build_view(self._view.config, formats, timezone)
+            else:
+                self._view = self._open_store(self._store_filename, formats, timezone)
 
     def read(self, files):
         """Attempt to read and parse an iterable of filenames, returning a list
-        of filenames which were successfully parsed.
+        of filenames which were successfully parsed. The files are read into a
+        copy of the current config, which replaces the current one when done.
+        """
+        with self._lock:
+            view = self._view
+            if len(view.config.sections()) == 0 and len(view.config.defaults()) == 0:
+                # nothing set yet, e.g., a new parser or a store
+                config = ConfigParser(**self._kwargs)
+            else:
+                config = copy.deepcopy(view.config)
+            read_ok = config.read(files)
+
+            self._store_filename = None
+            self._view = self._build_view(config, view.formats, view.timezone)
+        return read_ok
+
+    def set(self, epoch: str, option: str, value: str) -> None:
+        """Set the value of an option in an epoch, adding the epoch if it does
+        not exist. Like ``read``, the value is set in a copy of the current config
+        and a new view is swapped in, but only the values depending on the option
+        through interpolation are resolved again.
+
+        Parameters
+        ----------
+        epoch : str
+            epoch section name, or the default section to set an option for all
+            epochs
+        option : str
+            option name
+        value : str
+            raw value of the option, possibly referring to other options
+        """
+        if self._store_filename is not None:
+            raise ValueError("epoch stores are read-only")
+
+        with self._lock:
+            view = self._view
+            config = copy.deepcopy(view.config)
+            if epoch != config.default_section and not config.has_section(epoch):
+                config.add_section(epoch)
+            config.set(epoch, option, value)
+
+            if isinstance(view, EpochView):
+                self._view = view.replace(config, epoch, option)
+            else:
+                self._view = self._build_view(config, view.formats, view.timezone)
+
+    def _open_store(self, filename: str, formats, timezone) -> EpochView:
+        from . import store
+
+        return store.StoreView(filename, self._specs, formats, timezone)
+
+    def open_store(self, filename: str) -> None:
+        """Use an epoch store, see ``epochs.store``, instead of config files. The
+        store is memory-mapped and queried without loading it into memory. Reading
+        config files afterwards replaces the store.
+        """
+        with self._lock:
+            view = self._open_store(filename, self._view.formats, self._view.timezone)
+            self._store_filename = filename
+            self._view = view
+
+    async def aread(self, files, executor=None):
+        """Coroutine version of ``read``, reading the files and building the new
+        view in an executor, see ``epochs.aio``. Concurrent reads of the same
+        files by the parser are coalesced into a single read.
+        """
+        from . import aio
+
+        key = ("read", id(self), _filenames_key(files))
+        return await aio.coalesce(key, self.read, files, executor=executor)
+
+    def _date_or_default(self, date: DateValue) -> DateValue:
+        if date is None:
+            date = self._date
+            if date is None:
+                raise KeyError("no date for access given")
+        return date
+
+    def epochs(self) -> List[datetime.datetime]:
+        """Dates of the epochs, in order."""
+        return [e_dt for e_dt, e_name in self._view.epochs]
+
+    def options(self) -> List[str]:
+        """Names of all options, i.e., the options in the specification followed
+        by any other options set in an epoch.
+        """
+        return self._view.options()
+
+    def memory_stats(self) -> dict:
+        """Memory saved by sharing option names and identical values between
+        epochs, see ``EpochView.memory_stats``.
         """
-        return self.config.read(files)
+        return self._view.memory_stats()
 
     def get(
         self, option: str, date: DateValue = None, raw: bool = False, **kwargs
@@ -433,33 +1295,260 @@ class EpochConfigParser:
         option : str
             option name
         date : FileValue
-            date as a string or ``datetime.datetime``
+            date as a string or ``datetime.datetime``, defaults to ``date``
         raw : bool
             set to True is disable interpolation
         """
-        dt = self._date if date is None else self._parse_datetime(date)
-        if dt is None:
-            raise KeyError("no date for access given")
+        stats = _stats
+        if stats is None:
+            return self._get(option, self._date_or_default(date))
+
+        t0 = time.perf_counter()
+        try:
+            return self._get(option, self._date_or_default(date))
+        finally:
+            stats.record_call("EpochConfigParser.get", option, time.perf_counter() - t0)
+
+    def _get(self, option: str, date: DateValue) -> OptionValue:
+        days = self._days
+        if days is None:
+            return self._view.get(option, date)
+
+        view = self._view
+        if days.view is not view:
+            # the view was swapped since the table was built
+            days = _DayTable(view, days.start, days.end, days.max_days)
+            self._days = days
+        return days.get(option, date)
+
+    def materialize_days(
+        self, start: DateValue, end: DateValue, max_days: int = MAX_DAYS
+    ) -> None:
+        """Precompute the epoch in effect on each day of a range of days, so
+        ``get`` for a date in the range is a constant time table lookup instead
+        of a bisection of the epochs. Lookups outside of the range, or on days
+        when an epoch starts after midnight, still bisect the epochs. The table
+        is rebuilt when the epochs change, e.g., by ``read`` or ``set``.
+
+        Parameters
+        ----------
+        start : DateValue
+            first day of the range, as a string, ``datetime.datetime``, or
+            ``datetime.date``, or ``None`` to remove the table
+        end : DateValue
+            last day of the range
+        max_days : int
+            maximum number of days in the range, bounding the memory used by the
+            table
+        """
+        if start is None:
+            self._days = None
+        else:
+            self._days = _DayTable(self._view, start, end, max_days)
+
+    def interval(self, option: str, epoch: DateValue):
+        """Find the dates affected by a change of an option in an epoch, i.e.,
+        from the epoch until the next epoch setting the option.
+
+        Parameters
+        ----------
+        option : str
+            option name
+        epoch : DateValue
+            epoch section name or date, as a string or ``datetime.datetime``
+
+        Returns
+        -------
+        tuple
+            start and end ``datetime.datetime`` of the affected interval, the end
+            is ``None`` if no later epoch sets the option
+        """
+        view = self._view
+        dt = view.parse_datetime(epoch)
+        return dt, view.next_change(option, dt)
+
+    def intervals(self, epoch: DateValue, options: List[str] = None) -> dict:
+        """Find the dates affected by changes of several options in an epoch.
+
+        Parameters
+        ----------
+        epoch : DateValue
+            epoch section name or date, as a string or ``datetime.datetime``
+        options : List[str]
+            option names, defaults to all options
+
+        Returns
+        -------
+        dict
+            start and end of the affected interval by option name, see
+            ``interval``
+        """
+        view = self._view
+        dt = view.parse_datetime(epoch)
+        options = view.options() if options is None else options
+        return {o: (dt, view.next_change(o, dt)) for o in options}
+
+    def get_all(self, date: DateValue = None, options: List[str] = None) -> dict:
+        """Get the values of several options at a given date.
+
+        Parameters
+        ----------
+        date : DateValue
+            date as a string or ``datetime.datetime``, defaults to ``date``
+        options : List[str]
+            option names, defaults to all options
+
+        Returns
+        -------
+        dict
+            option values by option name
+        """
+        return self._view.get_all(self._date_or_default(date), options)
+
+    def trace(self, options: List[str] = None):
+        """Generate the changes of option values over time in a single pass over
+        the epochs. Epochs setting an option to the value it already has are not
+        reported.
 
-        specs = {
-            k: _parse_specline(v) for k, v in self.spec.specification.defaults().items()
+        Parameters
+        ----------
+        options : List[str]
+            option names to trace, defaults to all options
+
+        Yields
+        ------
+        tuple
+            datetime of the epoch, epoch section name, option name, and the new
+            value
+        """
+        return self._view.trace(options)
+
+    def diff(self, other: "EpochConfigParser", options: List[str] = None):
+        """Find where the effective values of options differ from the values in
+        another epoch file. The changes of both files are merged in a single
+        pass over their sorted epochs.
+
+        Parameters
+        ----------
+        other : EpochConfigParser
+            epoch file to compare to
+        options : List[str]
+            option names to compare, defaults to all options of either file
+
+        Returns
+        -------
+        List[OptionDifference]
+            intervals where values differ, grouped by option and in date order
+        """
+        view = self._view
+        other_view = other.view
+        if options is None:
+            options = list(dict.fromkeys(view.options() + other_view.options()))
+
+        values = {o: view.specs.get(o, UNSPECIFIED).default for o in options}
+        other_values = {
+            o: other_view.specs.get(o, UNSPECIFIED).default for o in options
         }
 
-        epoch_names = self.config.sections()
+        # start date and values of the current difference of each option
+        differences = {o: [] for o in options}
+        current = {
+            o: (None, values[o], other_values[o])
+            for o in options
+            if values[o] != other_values[o]
+        }
+
+        def close(o, end):
+            start, value, other_value = current.pop(o)
+            differences[o].append(OptionDifference(o, start, end, value, other_value))
+
+        changes = heapq.merge(
+            ((e_dt, 0, o, v) for e_dt, e_name, o, v in view.trace(options)),
+            ((e_dt, 1, o, v) for e_dt, e_name, o, v in other_view.trace(options)),
+            key=lambda c: c[0],
+        )
+        for e_dt, group in itertools.groupby(changes, key=lambda c: c[0]):
+            changed = {}
+            for _, side, o, v in group:
+                changed[o] = None
+                if side == 0:
+                    values[o] = v
+                else:
+                    other_values[o] = v
+            for o in changed:
+                if o in current:
+                    close(o, e_dt)
+                if values[o] != other_values[o]:
+                    current[o] = (e_dt, values[o], other_values[o])
 
-        epoch_dts = [self._parse_datetime(s) for s in epoch_names]
-        sorted_epoch_dts = sorted(zip(epoch_dts, epoch_names), key=lambda x: x[0])
+        for o in list(current):
+            close(o, None)
 
-        value = specs[option].default
-        for e_dt, e_name in sorted_epoch_dts:
-            if e_dt <= dt and self.config.has_option(e_name, option):
-                value = _convert(
-                    self.config.get(e_name, option),
-                    specs[option].type,
-                    specs[option].list,
-                )
+        return [d for o in options for d in differences[o]]
+
+    def diff_dates(
+        self, date: DateValue, other_date: DateValue, options: List[str] = None
+    ) -> dict:
+        """Find the options with different values at two dates.
+
+        Parameters
+        ----------
+        date : DateValue
+            date as a string or ``datetime.datetime``
+        other_date : DateValue
+            date to compare to, as a string or ``datetime.datetime``
+        options : List[str]
+            option names to compare, defaults to all options
+
+        Returns
+        -------
+        dict
+            tuples of the values at `date` and `other_date` by option name
+        """
+        view = self._view
+        values = view.get_all(date, options)
+        other_values = view.get_all(other_date, options)
+        return {
+            o: (v, other_values[o]) for o, v in values.items() if v != other_values[o]
+        }
+
+    def to_table(self, options: List[str] = None, kind: str = "numpy"):
+        """Table of the values of options at each epoch, with one row per epoch
+        and one column per option, typed by the specification. Values are carried
+        forward from earlier epochs and the table is built in a single pass over
+        the epochs.
+
+        Parameters
+        ----------
+        options : List[str]
+            option names, defaults to all options
+        kind : str
+            "numpy" for a NumPy masked structured array, where options without a
+            value are masked, or "arrow" for a ``pyarrow.Table``, where they are
+            null; the first column, "epoch", is the date of each epoch, in UTC
+            if the epochs have a time zone
+
+        Returns
+        -------
+        numpy.ma.MaskedArray or pyarrow.Table
+        """
+        view = self._view
+        dates, columns = view.columns(options)
+        if kind == "numpy":
+            return _numpy_table(dates, columns, view.specs)
+        elif kind == "arrow":
+            return _arrow_table(dates, columns, view.specs)
+        else:
+            raise ValueError(f"invalid table kind: {kind}")
+
+    def to_parquet(self, filename: str, options: List[str] = None) -> None:
+        """Write the table of the values of options at each epoch, see
+        ``to_table``, to a Parquet file. Requires pyarrow.
+        """
+        table = self.to_table(options, kind="arrow")
+        import pyarrow.parquet
 
-        return value
+        pyarrow.parquet.write_table(table, filename)
 
     def _write(self, fileobject: TextIO) -> None:
         """Write the configuration to a file-like object
@@ -469,7 +1558,7 @@ class EpochConfigParser:
         fileobject : TextIO
             file-like object to write to
         """
-        self.config.write(fileobject)
+        self._view.config.write(fileobject)
 
     def write(self, file: FileType, space_around_delimiters: bool = True) -> None:
         """Write config file to a file-like object
@@ -506,7 +1595,8 @@ class EpochConfigParser:
             return True
 
         # check to make sure sections are dates
-        for s in self.config.sections():
+        config = self._view.config
+        for s in config.sections():
             try:
                 dateutil.parser.parse(s)
             except ValueError:
@@ -514,8 +1604,8 @@ class EpochConfigParser:
 
         # check options are in spec
         if not allow_extra_options:
-            for s in self.config.sections():
-                for o in self.config.options(s):
+            for s in config.sections():
+                for o in config.options(s):
                     if not self.spec.has_option("DEFAULT", o):
                         return False
 
@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+
+"""Module defining a compact, read-only store of the epochs of an epoch config
+file, which is queried through ``mmap`` without loading it into memory.
+
+A store starts with an 8 byte magic number and the length of a JSON header,
+followed by the header and the data columns, each aligned to 8 bytes. The
+columns are:
+
+* the sorted epoch dates, as int64 microseconds since 1970-01-01, in UTC if the
+  header gives the time zone of the epochs,
+* the epoch section names, as string offsets and UTF-8 bytes,
+* for each option, the int64 positions of the epochs setting the option and of
+  the option in their sections, and the offsets and UTF-8 bytes of its
+  interpolated values.
+
+The header gives the offset of each column relative to the start of the data.
+Stores are written by ``epochs convert`` or ``write_store``, and opened by
+``EpochConfigParser.open_store``.
+"""
+
+import array
+import bisect
+import collections.abc
+import datetime
+import heapq
+import itertools
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import List
+
+from .configparser import (
+    UNSPECIFIED,
+    ConfigParser,
+    DateValue,
+    EpochView,
+    _convert,
+    _get_timezone,
+)
+
+MAGIC = b"EPOCHS\x00\x01"
+VERSION = 1
+
+_UNIX_EPOCH = datetime.datetime(1970, 1, 1)
+_UNIX_EPOCH_UTC = _UNIX_EPOCH.replace(tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def _timestamp(dt: datetime.datetime) -> int:
+    unix_epoch = _UNIX_EPOCH if dt.tzinfo is None else _UNIX_EPOCH_UTC
+    return (dt - unix_epoch) // _MICROSECOND
+
+
+def _datetime(timestamp: int, utc: bool = False) -> datetime.datetime:
+    return (_UNIX_EPOCH_UTC if utc else _UNIX_EPOCH) + timestamp * _MICROSECOND
+
+
+def is_store(filename: str) -> bool:
+    """Check whether a file is an epoch store."""
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def write_store(view: EpochView, filename: str) -> None:
+    """Write the epochs of an ``EpochView``, i.e., ``EpochConfigParser.view``,
+    to a store file.
+    """
+    chunks = []
+    size = 0
+
+    def add(data: bytes) -> int:
+        nonlocal size
+        offset = size
+        padding = b"\0" * (-len(data) % 8)
+        chunks.extend([data, padding])
+        size += len(data) + len(padding)
+        return offset
+
+    def add_int64s(values) -> int:
+        return add(array.array("q", values).tobytes())
+
+    def add_strings(strings) -> dict:
+        encoded = [s.encode("utf-8") for s in strings]
+        lengths = itertools.accumulate(len(s) for s in encoded)
+        offsets = itertools.chain([0], lengths)
+        return {"offsets": add_int64s(offsets), "bytes": add(b"".join(encoded))}
+
+    positions = collections.defaultdict(list)
+    ranks = collections.defaultdict(list)
+    values = collections.defaultdict(list)
+    for i, (e_dt, e_name) in enumerate(view.epochs):
+        for r, o in enumerate(view.config.options(e_name)):
+            positions[o].append(i)
+            ranks[o].append(r)
+            values[o].append(view.config.get(e_name, o))
+
+    if view.timezone is not None and not isinstance(view.timezone, str):
+        raise ValueError("the time zone of a store must be given by name")
+
+    header = {
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "timezone": view.timezone,
+        "epochs": {
+            "count": len(view.epochs),
+            "dates": add_int64s(_timestamp(e_dt) for e_dt, e_name in view.epochs),
+            "names": add_strings(e_name for e_dt, e_name in view.epochs),
+        },
+        "options": {
+            o: {
+                "count": len(positions[o]),
+                "positions": add_int64s(positions[o]),
+                "ranks": add_int64s(ranks[o]),
+                "values": add_strings(values[o]),
+            }
+            for o in positions
+        },
+    }
+    encoded_header = json.dumps(header).encode("utf-8")
+    encoded_header += b" " * (-len(encoded_header) % 8)
+
+    # write to a temporary file first, so a store is never opened half written
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(encoded_header)))
+        f.write(encoded_header)
+        for c in chunks:
+            f.write(c)
+    os.replace(tmp_filename, filename)
+
+
+class _Strings(collections.abc.Sequence):
+    """Strings of a store column, decoded when accessed."""
+
+    def __init__(self, offsets: memoryview, data: memoryview) -> None:
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return bytes(self._data[start:end]).decode("utf-8")
+
+
+class _Epochs(collections.abc.Sequence):
+    """Dates and section names of the epochs of a store, in the same form as
+    ``EpochView.epochs``.
+    """
+
+    def __init__(self, dates: memoryview, names: _Strings, utc: bool) -> None:
+        self._dates = dates
+        self._names = names
+        self._utc = utc
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def __getitem__(self, i: int):
+        return _datetime(self._dates[i], self._utc), self._names[i]
+
+
+_Column = collections.namedtuple("_Column", "positions ranks values")
+
+
+class StoreView(EpochView):
+    """Read-only ``EpochView`` of a memory-mapped epoch store. Opening a store
+    only reads its header, and lookups bisect the columns of the mapped file, so
+    startup time and resident memory do not grow with the number of epochs.
+
+    The time zone of the epochs defaults to the one the store was written with,
+    in which case its dates are in UTC. Another time zone only changes how naive
+    query dates are interpreted.
+    """
+
+    def __init__(self, filename: str, specs: dict, formats=None, timezone=None):
+        self.filename = filename
+        self._unspecified = specs is None
+        self.specs = {} if specs is None else specs
+        self.formats = None if formats is None else tuple(formats)
+        # a store has no config sections, reading config files replaces it
+        self.config = ConfigParser()
+
+        with open(filename, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        if bytes(buffer[: len(MAGIC)]) != MAGIC:
+            raise ValueError(f"not an epoch store: {filename}")
+        (header_length,) = struct.unpack_from("<Q", buffer, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        header = json.loads(bytes(buffer[header_start : header_start + header_length]))
+        if header["version"] != VERSION:
+            raise ValueError(f"unsupported epoch store version {header['version']}")
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(
+                f"epoch store written on a {header['byteorder']} endian system"
+            )
+        data = buffer[header_start + header_length :]
+
+        utc = header["timezone"] is not None
+        if timezone is None:
+            timezone = header["timezone"]
+        elif not utc:
+            raise ValueError(f"epoch store without a time zone: {filename}")
+        self.timezone = timezone
+        self._tz = _get_timezone(timezone)
+        self._utc = utc
+
+        def int64s(offset: int, count: int) -> memoryview:
+            return data[offset : offset + 8 * count].cast("q")
+
+        def strings(column: dict, count: int) -> _Strings:
+            offsets = int64s(column["offsets"], count + 1)
+            return _Strings(offsets, data[column["bytes"] :])
+
+        n_epochs = header["epochs"]["count"]
+        self._dates = int64s(header["epochs"]["dates"], n_epochs)
+        names = strings(header["epochs"]["names"], n_epochs)
+        self.epochs = _Epochs(self._dates, names, utc)
+
+        self._columns = {
+            o: _Column(
+                int64s(c["positions"], c["count"]),
+                int64s(c["ranks"], c["count"]),
+                strings(c["values"], c["count"]),
+            )
+            for o, c in header["options"].items()
+        }
+
+        options = itertools.chain(self.specs, self._columns)
+        self._options = list(dict.fromkeys(options))
+
+    def _epoch_dates(self):
+        # bisect the mapped dates instead of loading them
+        return self._dates, _timestamp
+
+    def memory_stats(self) -> dict:
+        # values are decoded and converted when accessed, never kept in memory
+        n_values = sum(len(c.positions) for c in self._columns.values())
+        return {"values": n_values, "unique_values": 0, "bytes_saved": 0}
+
+    def _position(self, option: str, dt: datetime.datetime):
+        """Column of an option and the position in it of the value in effect at a
+        given date, -1 if no epoch before the date sets the option.
+        """
+        if dt.tzinfo is not None and not self._utc:
+            # like comparing the datetimes of the epochs of a config
+            raise TypeError("can't compare offset-naive and offset-aware datetimes")
+        column = self._columns.get(option)
+        if column is None:
+            return None, -1
+        i = bisect.bisect_right(self._dates, _timestamp(dt)) - 1
+        return column, bisect.bisect_right(column.positions, i) - 1
+
+    def lookup(self, option: str, dt: datetime.datetime) -> str:
+        column, j = self._position(option, dt)
+        return None if j < 0 else self.epochs[column.positions[j]][1]
+
+    def next_change(self, option: str, dt: datetime.datetime) -> datetime.datetime:
+        column, j = self._position(option, dt)
+        if column is None or j + 1 >= len(column.positions):
+            return None
+        return _datetime(self._dates[column.positions[j + 1]], self._utc)
+
+    def get(self, option: str, date: DateValue):
+        spec = self.option_spec(option)
+        column, j = self._position(option, self.parse_datetime(date))
+        if j < 0:
+            return spec.default
+        return _convert(column.values[j], spec.type, spec.list)
+
+    def get_all(self, date: DateValue, options: List[str] = None) -> dict:
+        dt = self.parse_datetime(date)
+        options = self._options if options is None else options
+        values = {}
+        for o in options:
+            s = self.specs.get(o, UNSPECIFIED)
+            column, j = self._position(o, dt)
+            values[o] = (
+                s.default if j < 0 else _convert(column.values[j], s.type, s.list)
+            )
+        return values
+
+    def _changes(self, options: List[str]):
+        """Raw values set by the epochs for options, in the order of the epochs and
+        of the options in their sections.
+        """
+
+        def column_changes(o):
+            column = self._columns[o]
+            for change in zip(column.positions, column.ranks, column.values):
+                yield change[0], change[1], o, change[2]
+
+        return heapq.merge(*[column_changes(o) for o in options if o in self._columns])
+
+    def trace(self, options: List[str] = None):
+        options = self._options if options is None else options
+        specs = {o: self.specs.get(o, UNSPECIFIED) for o in options}
+        values = {o: s.default for o, s in specs.items()}
+
+        for position, rank, o, raw in self._changes(options):
+            s = specs[o]
+            v = _convert(raw, s.type, s.list)
+            if v != values[o]:
+                values[o] = v
+                e_dt, e_name = self.epochs[position]
+                yield e_dt, e_name, o, v
+
+    def columns(self, options: List[str] = None):
+        options = self._options if options is None else options
+        specs = {o: self.specs.get(o, UNSPECIFIED) for o in options}
+        values = {o: s.default for o, s in specs.items()}
+        columns = {o: [] for o in options}
+
+        changes = itertools.groupby(self._changes(options), key=lambda c: c[0])
+        next_position, group = next(changes, (None, None))
+        for i in range(len(self.epochs)):
+            if i == next_position:
+                for position, rank, o, raw in group:
+                    s = specs[o]
+                    values[o] = _convert(raw, s.type, s.list)
+                next_position, group = next(changes, (None, None))
+            for o, column in columns.items():
+                column.append(values[o])
+
+        return [_datetime(d, self._utc) for d in self._dates], columns
@@ -4,16 +4,34 @@
 """
 
 import argparse
+import collections
+import contextlib
+import copy
 import datetime
+import functools
+import hashlib
+import heapq
+import io
+import json
 import os
+import pickle
 import re
+import sys
 import textwrap
+import time
 import warnings
 
 import dateutil.parser
 import matplotlib
+import matplotlib.artist
 import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
+import matplotlib.textpath
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.backends.backend_svg import FigureCanvasSVG
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+import numpy as np
 import yaml
 
 try:
@@ -22,7 +40,10 @@ except ImportError:
     from yaml import Loader
 
 import epochs
+from epochs import aio
 
+# the pure Python "Loader" is many times slower than the libyaml "CLoader"
+YAML_LOADER = Loader.__name__
 
 named_colors = matplotlib.colors.get_named_colors_mapping()
 hex_color_re = re.compile("^#[ABCDEFabcdef0-9]{6}$")
@@ -62,16 +83,94 @@ def warn(msg):
     print(f"WARNING: {msg}")
 
 
-def load(filename):
-    with open(filename, "r") as f:
-        y = yaml.load(f, Loader=Loader)
+def load(filename, cache_dir=None):
+    """Load a timeline YAML file.
+
+    If `cache_dir` is given, the parsed timeline is pickled there, keyed by the
+    hash of the file contents and the YAML loader, and later loads of the same
+    contents are read from the cache instead of parsing the YAML again. Since
+    the cache is pickled, `cache_dir` must only be writable by trusted users. A
+    cache file that can not be read, e.g., a corrupt or stale one, is ignored
+    and written again.
+    """
+    if cache_dir is None:
+        with open(filename, "r") as f:
+            y = yaml.load(f, Loader=Loader)
+        return y
+
+    with open(filename, "rb") as f:
+        contents = f.read()
+
+    h = hashlib.sha256(contents)
+    h.update(f"{YAML_LOADER} {yaml.__version__}".encode("utf-8"))
+    cache_filename = os.path.join(cache_dir, f"{h.hexdigest()}.pickle")
+
+    try:
+        with open(cache_filename, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        # any failure to read the cache is a miss
+        pass
+
+    y = yaml.load(contents, Loader=Loader)
+
+    # write to a temporary file first, so concurrent loads never see a partial
+    # cache file
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_filename = f"{cache_filename}.{os.getpid()}.tmp"
+    with open(tmp_filename, "wb") as f:
+        pickle.dump(y, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_filename, cache_filename)
+
     return y
 
 
+async def aload(filename, cache_dir=None, executor=None):
+    """Coroutine version of ``load``, loading the file in an executor, see
+    ``epochs.aio``. Concurrent loads of the same file are coalesced into a single
+    load, so their callers share the returned timeline.
+    """
+    key = ("load", os.path.abspath(filename), cache_dir)
+    return await aio.coalesce(
+        key, load, filename, cache_dir=cache_dir, executor=executor
+    )
+
+
 def loads(s):
     return yaml.load(s, Loader=Loader)
 
 
+@functools.lru_cache(maxsize=65536)
+def _parse_date_string(s):
+    return dateutil.parser.parse(s)
+
+
+def _parse_date(value):
+    """Convert a date of a timeline to a naive ``datetime.datetime``, in UTC for
+    dates with a UTC offset. Each distinct date string is only parsed once.
+    """
+    if isinstance(value, datetime.datetime):
+        dt = value
+    elif isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    else:
+        dt = _parse_date_string(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def parse_dates(timeline):
+    """Replace the dates of all items of a timeline with ``datetime.datetime``
+    values, so later stages never parse dates.
+    """
+    for item in timeline.values():
+        for field in ["start", "end", "date"]:
+            value = item.get(field)
+            if value is not None and value != "now":
+                item[field] = _parse_date(value)
+
+
 def _get_type(timeline, typename):
     return [item for item in timeline if timeline[item].get("type") == typename]
 
@@ -105,6 +204,64 @@ class ParsingError(Exception):
     """Throw if there is any parsing error in the timeline specification."""
 
 
+class StageTimer(object):
+    """Accumulate the wall time, number of calls, and number of items of each
+    stage of rendering a timeline.
+
+    Stages started inside another stage, e.g., date parsing during the interval
+    pass, are reported separately and not added to the total. If given, `hook`
+    is called with the stage name, the elapsed time in seconds, and the number
+    of items at the end of every stage.
+    """
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.times = {}
+        self.calls = {}
+        self.items = {}
+        self.nested = set()
+        self._depth = 0
+
+    @contextlib.contextmanager
+    def __call__(self, stage, items=None):
+        if self._depth > 0:
+            self.nested.add(stage)
+        self._depth += 1
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            self._depth -= 1
+            self.times[stage] = self.times.get(stage, 0.0) + elapsed
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+            if items is not None:
+                self.items[stage] = self.items.get(stage, 0) + items
+            if self.hook is not None:
+                self.hook(stage, elapsed, items)
+
+    def _report_stage(self, stage, width, file):
+        line = f"{stage:{width}s} {1000.0 * self.times[stage]:10.1f} ms"
+        line += f" {self.calls[stage]:8d} calls"
+        if stage in self.items:
+            line += f" {self.items[stage]:8d} items"
+        print(line, file=file)
+
+    def report(self, file=sys.stdout):
+        width = max([len(s) for s in self.times] + [5])
+        top_stages = [s for s in self.times if s not in self.nested]
+        for stage in top_stages:
+            self._report_stage(stage, width, file)
+        total = sum(self.times[s] for s in top_stages)
+        print(f"{'total':{width}s} {1000.0 * total:10.1f} ms", file=file)
+
+        if len(self.nested) > 0:
+            print("\nincluded in the above stages:", file=file)
+            for stage in self.times:
+                if stage in self.nested:
+                    self._report_stage(stage, width, file)
+
+
 class timeline_coords(object):
     annotation_fontsize = 5  # pts
     ticklabel_fontsize = 7  # pts
@@ -112,12 +269,15 @@ class timeline_coords(object):
     ax = None
     top_ax = None
 
-    def __init__(self, timeline, top_name):
-        self.start_date = dateutil.parser.parse(timeline[top_name]["start"])
-        self.end_date = dateutil.parser.parse(timeline[top_name]["end"])
+    def __init__(self, timeline, top_name, timer=None):
+        self.timer = StageTimer() if timer is None else timer
+
+        self.start_date = _parse_date(timeline[top_name]["start"])
+        self.end_date = _parse_date(timeline[top_name]["end"])
 
         self.width = timeline[top_name].get("width", 8.0)
         self.height = timeline[top_name].get("height", 8.0)
+        self.dpi = timeline[top_name].get("dpi", 100.0)
 
         self.interval_title_fontsize = timeline[top_name].get("title_fontsize", 8)
         self.note_fontsize = timeline[top_name].get("note_fontsize", 6)  # pts
@@ -133,47 +293,220 @@ class timeline_coords(object):
             0.25 * self.line_height * self.note_fontsize / (self.height * 72)
         )
 
+        # height of a lane of automatically placed intervals: room for start/end
+        # annotations above the line, and the title and a note below it
+        self.lane_height = (
+            3 * self.y_annotation_gap
+            + self.note_gap
+            + self.line_height
+            * (self.interval_title_fontsize + self.note_fontsize)
+            / (self.height * 72)
+        )
+        self.lanes_top = timeline[top_name].get("lanes_top", 0.85)
+
+        left_margin = timeline[top_name].get("left-margin", None)
+        right_margin = timeline[top_name].get("right-margin", None)
+        top_margin = timeline[top_name].get("top-margin", None)
+        bottom_margin = timeline[top_name].get("bottom-margin", None)
+
+        # margins as fractions of the figure
+        self.left_margin = 0.05 if left_margin is None else left_margin / self.width
+        self.right_margin = 0.05 if right_margin is None else right_margin / self.width
+        self.top_margin = 0.05 if top_margin is None else top_margin / self.height
+        self.bottom_margin = (
+            0.05 if bottom_margin is None else bottom_margin / self.height
+        )
+
+    @property
+    def axes_size(self):
+        """Width and height of the axes in pixels."""
+        width = (1.0 - self.left_margin - self.right_margin) * self.width
+        height = (1.0 - self.top_margin - self.bottom_margin) * self.height
+        return width * self.dpi, height * self.dpi
+
     def get_date_coord(self, date):
         return (date - self.start_date) / (self.end_date - self.start_date)
 
+    def get_date_coords(self, dates):
+        """Convert an array of dates to axis fractions in one operation."""
+        dates = np.asarray(dates, dtype="datetime64[us]")
+        start = np.datetime64(self.start_date, "us")
+        return (dates - start) / (np.datetime64(self.end_date, "us") - start)
+
+    def get_coord_dates(self, coords):
+        """Convert an array of axis fractions to ``datetime64`` dates, i.e., the
+        inverse of ``get_date_coords``.
+        """
+        start = np.datetime64(self.start_date, "us")
+        span = (np.datetime64(self.end_date, "us") - start).astype(float)
+        offsets = np.round(np.asarray(coords, dtype=float) * span)
+        return start + offsets.astype("timedelta64[us]")
+
+
+_UNIX_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def _datetime64(dates):
+    """Convert a list of naive ``datetime.datetime`` to a ``datetime64[us]``
+    array, several times faster than letting NumPy convert each object.
+    """
+    offsets = ((d - _UNIX_EPOCH) // _MICROSECOND for d in dates)
+    return np.fromiter(offsets, dtype=np.int64, count=len(dates)).view("datetime64[us]")
+
+
+IntervalArrays = collections.namedtuple("IntervalArrays", "names starts ends xmin xmax")
+IntervalArrays.__doc__ = """Names of intervals with their start and end dates as
+``datetime64`` arrays and their axis coordinates"""
+
+
+def interval_arrays(timeline, coords, names=None):
+    """Store the resolved dates of intervals in arrays and compute their axis
+    coordinates in a single operation.
+    """
+    names = _get_type(timeline, "interval") if names is None else names
+    starts = _datetime64([timeline[n]["start"] for n in names])
+    ends = _datetime64([timeline[n]["end"] for n in names])
+    return IntervalArrays(
+        names=names,
+        starts=starts,
+        ends=ends,
+        xmin=coords.get_date_coords(starts),
+        xmax=coords.get_date_coords(ends),
+    )
 
-def get_locator(timeline, top_name, ticks):
+
+class IntervalIndex(object):
+    """Intervals sorted by start date, to find the intervals overlapping a range of
+    dates without checking every interval.
+
+    Parameters
+    ----------
+    names : list
+        names of the intervals
+    starts, ends : array
+        ``datetime64`` start and end dates of the intervals
+    """
+
+    def __init__(self, names, starts, ends):
+        self.names = names
+        self._order = np.argsort(starts, kind="stable")
+        self._starts = starts[self._order]
+        self._ends = ends[self._order]
+        # only intervals starting at most this long before a range can overlap it
+        self._max_length = (
+            np.max(self._ends - self._starts) if len(names) > 0 else np.timedelta64(0)
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays.names, arrays.starts, arrays.ends)
+
+    def overlapping(self, start, end):
+        """Names of the intervals overlapping the range from `start` to `end`, in
+        their original order.
+        """
+        start = np.datetime64(start, "us")
+        end = np.datetime64(end, "us")
+        lo = np.searchsorted(self._starts, start - self._max_length, side="left")
+        hi = np.searchsorted(self._starts, end, side="right")
+        mask = self._ends[lo:hi] >= start
+        indices = np.sort(self._order[lo:hi][mask])
+        return [self.names[k] for k in indices.tolist()]
+
+
+def _create_locators(ticks):
     if ticks == "days":
-        tick_format = timeline[top_name].get("tick-format", "%d %b %y")
+        tick_format = "%d %b %y"
         major_locator = mdates.DayLocator(interval=1)
         minor_locator = None
     elif ticks == "weeks":
-        tick_format = timeline[top_name].get("tick-format", "%d %b %y")
+        tick_format = "%d %b %y"
         major_locator = mdates.WeekdayLocator(byweekday=mdates.MONDAY, interval=1)
         minor_locator = mdates.WeekdayLocator(byweekday=mdates.MONDAY, interval=1)
     elif ticks == "months":
-        tick_format = timeline[top_name].get("tick-format", "%b %y")
+        tick_format = "%b %y"
         major_locator = mdates.MonthLocator(interval=1)
         minor_locator = mdates.WeekdayLocator(byweekday=mdates.MONDAY, interval=1)
     elif ticks == "years":
-        tick_format = timeline[top_name].get("tick-format", "%y")
+        tick_format = "%y"
         major_locator = mdates.YearLocator(month=1)
         minor_locator = mdates.MonthLocator(interval=1)
     elif ticks == "hours":
-        tick_format = timeline[top_name].get("tick-format", "%H")
+        tick_format = "%H"
         major_locator = mdates.HourLocator(interval=1)
         minor_locator = mdates.MinuteLocator(interval=15)
     else:
-        tick_format = timeline[top_name].get("tick-format", "%d %b %y")
+        tick_format = "%d %b %y"
         major_locator = mdates.WeekdayLocator(byweekday=mdates.MONDAY, interval=1)
         minor_locator = None
 
     return tick_format, major_locator, minor_locator
 
 
-def setup_plot(timeline, coords, top_name):
-    fig, ax = plt.subplots(figsize=(coords.width, coords.height))
+def get_locator(timeline, top_name, ticks):
+    tick_format, major_locator, minor_locator = _create_locators(ticks)
+    tick_format = timeline[top_name].get("tick-format", tick_format)
+    return tick_format, major_locator, minor_locator
+
+
+TickGrid = collections.namedtuple("TickGrid", "locations midpoints week_numbers")
+TickGrid.__doc__ = """Tick locations of an interval and the midpoints between them,
+in matplotlib date numbers, along with the week number of each tick"""
+
+
+def _week_numbers(locations):
+    """Week numbers of the year, as given by ``%W``, of matplotlib date numbers."""
+    if matplotlib.rcParams["timezone"] != "UTC":
+        return np.array(
+            [int(mdates.num2date(t).strftime("%W")) for t in locations], dtype=int
+        )
+
+    dts = np.datetime64(mdates.get_epoch(), "us") + np.round(
+        locations * 86400e6
+    ).astype("timedelta64[us]")
+    days = dts.astype("datetime64[D]")
+    day_of_year = (days - days.astype("datetime64[Y]")).astype(int)
+    weekday = (days.astype(int) + 3) % 7  # 1970-01-01 was a Thursday
+    return (day_of_year + 7 - weekday) // 7
+
+
+@functools.lru_cache(maxsize=64)
+def get_tick_grid(interval, vmin, vmax):
+    """Compute the ticks for an interval, i.e., "days", "weeks", etc., between the
+    axis limits `vmin` and `vmax`. The results are cached, so the returned arrays
+    are read-only.
+    """
+    _, major_locator, _ = _create_locators(interval)
+    locations = np.asarray(
+        major_locator.tick_values(mdates.num2date(vmin), mdates.num2date(vmax)),
+        dtype=float,
+    )
+    grid = TickGrid(
+        locations=locations,
+        midpoints=0.5 * (locations[1:] + locations[0:-1]),
+        week_numbers=_week_numbers(locations),
+    )
+    for a in grid:
+        a.flags.writeable = False
+    return grid
+
+
+def setup_plot(timeline, coords, top_name, fig=None):
+    # use the Agg canvas directly instead of pyplot, so no GUI backend is ever
+    # selected or imported
+    if fig is None:
+        fig = Figure(figsize=(coords.width, coords.height), dpi=coords.dpi)
+        FigureCanvasAgg(fig)
+    else:
+        fig.clear()
+    ax = fig.add_subplot()
 
     axes_name = timeline[top_name].get("axes", "").lower()
 
-    plt.tick_params(labelsize=coords.ticklabel_fontsize)
+    ax.tick_params(labelsize=coords.ticklabel_fontsize)
     top_ax = ax.twiny()
-    plt.tick_params(labelsize=coords.ticklabel_fontsize)
+    top_ax.tick_params(labelsize=coords.ticklabel_fontsize)
 
     coords.ax = ax
     coords.top_ax = top_ax
@@ -203,33 +536,23 @@ def setup_plot(timeline, coords, top_name):
     top_ax.set_xlim(ax.get_xlim())
 
     grid_color = "#e8e8e8"
-    # plt.grid(which="minor", axis="x", linestyle=":", color=grid_color)
-    plt.grid(which="major", axis="x", color=grid_color)
+    # top_ax.grid(which="minor", axis="x", linestyle=":", color=grid_color)
+    top_ax.grid(which="major", axis="x", color=grid_color)
 
     # set title of timeline
     title = timeline[top_name].get("title")
     title = (title if title is not None else top_name).encode().decode("unicode_escape")
-    plt.title(title, y=1.1)
-
-    left_margin = timeline[top_name].get("left-margin", None)
-    right_margin = timeline[top_name].get("right-margin", None)
-    top_margin = timeline[top_name].get("top-margin", None)
-    bottom_margin = timeline[top_name].get("bottom-margin", None)
-
-    left_margin = 0.05 if left_margin is None else left_margin / coords.width
-    right_margin = 0.05 if right_margin is None else right_margin / coords.width
-    top_margin = 0.05 if top_margin is None else top_margin / coords.height
-    bottom_margin = 0.05 if bottom_margin is None else bottom_margin / coords.height
-
-    plt.subplots_adjust(
-        left=left_margin,
-        right=1.0 - right_margin,
-        top=1.0 - top_margin,
-        bottom=bottom_margin,
+    top_ax.set_title(title, y=1.1)
+
+    fig.subplots_adjust(
+        left=coords.left_margin,
+        right=1.0 - coords.right_margin,
+        top=1.0 - coords.top_margin,
+        bottom=coords.bottom_margin,
     )
 
-    plt.setp(ax.get_xticklabels(), rotation=-25, ha="left")
-    plt.setp(top_ax.get_xticklabels(), rotation=25, ha="left")
+    matplotlib.artist.setp(ax.get_xticklabels(), rotation=-25, ha="left")
+    matplotlib.artist.setp(top_ax.get_xticklabels(), rotation=25, ha="left")
 
     for i, label in enumerate(ax.xaxis.get_ticklabels()):
         if i % coords.time_tick_display_cadence != 0:
@@ -242,31 +565,22 @@ def setup_plot(timeline, coords, top_name):
     return fig, ax
 
 
-def render_values(timeline, fig, coords, ax, verbose=False):
-    values = _get_type(timeline, "value")
-    for name in values:
-        if verbose:
-            print(f"value: {name}")
-
-        v = timeline[name]
-        interval = v["interval"]
-        interval_values = v["value"].split()
-        yloc = v["location"]
-        rotation = v["rotation"] if "rotation" in v else "horizontal"
-        fontsize = v["fontsize"] if "fontsize" in v else 4
+def _draw_value(timeline, name, fig, coords, ax):
+    v = timeline[name]
+    interval = v["interval"]
+    interval_values = v["value"].split()
+    yloc = v["location"]
+    rotation = v["rotation"] if "rotation" in v else "horizontal"
+    fontsize = v["fontsize"] if "fontsize" in v else 4
 
-        axis = coords.ax
+    axis = coords.ax
 
-        top_name = _get_type(timeline, "timeline")[0]
-        format, major_locator, minor_locator = get_locator(timeline, top_name, interval)
-        vmin, vmax = axis.get_xlim()
-        tick_locations = major_locator.tick_values(
-            mdates.num2date(vmin), mdates.num2date(vmax)
-        )
-        xlocs = 0.5 * (tick_locations[1:] + tick_locations[0:-1])
+    grid = get_tick_grid(interval, *axis.get_xlim())
 
-        for t, x, interval_value in zip(tick_locations, xlocs, interval_values):
-            plt.text(
+    artists = []
+    for x, interval_value in zip(grid.midpoints, interval_values):
+        artists.append(
+            coords.top_ax.text(
                 x,
                 yloc,
                 f"{interval_value}",
@@ -276,89 +590,92 @@ def render_values(timeline, fig, coords, ax, verbose=False):
                 fontsize=fontsize,
                 color="#606060",
             )
+        )
+    return artists
 
 
-def render_numbering(timeline, fig, coords, ax, verbose=False):
-    numberings = _get_type(timeline, "numbering")
-    for name in numberings:
+def render_values(timeline, fig, coords, ax, verbose=False):
+    artists = {}
+    values = _get_type(timeline, "value")
+    for name in values:
         if verbose:
-            print(f"numbering: {name}")
-
-        n = timeline[name]
-
-        margin = 0.005
-        position = n["position"] if "position" in n else "top"
-        if position == "top":
-            va = "bottom"
-            yloc = 1.0 + margin
-            axis = coords.top_ax
-        elif position == "bottom":
-            va = "top"
-            yloc = 0.0 - margin
-            axis = coords.ax
-        else:
-            va = "bottom"
-            yloc = 1.0 + margin
-            axis = coords.top_ax
-
-        interval = n["interval"] if "interval" in n else "days"
-        fontsize = n["fontsize"] if "fontsize" in n else 5
-
-        # TODO: need to find a better way to specify these locations using the
-        # value of interval
-        top_name = _get_type(timeline, "timeline")[0]
-        format, major_locator, minor_locator = get_locator(timeline, top_name, interval)
-        vmin, vmax = axis.get_xlim()
-        tick_locations = major_locator.tick_values(
-            mdates.num2date(vmin), mdates.num2date(vmax)
-        )
+            print(f"value: {name}")
+        artists[name] = _draw_value(timeline, name, fig, coords, ax)
+    return artists
+
+
+def _draw_numbering(timeline, name, fig, coords, ax):
+    n = timeline[name]
+
+    margin = 0.005
+    position = n["position"] if "position" in n else "top"
+    if position == "top":
+        va = "bottom"
+        yloc = 1.0 + margin
+        axis = coords.top_ax
+    elif position == "bottom":
+        va = "top"
+        yloc = 0.0 - margin
+        axis = coords.ax
+    else:
+        va = "bottom"
+        yloc = 1.0 + margin
+        axis = coords.top_ax
+
+    interval = n["interval"] if "interval" in n else "days"
+    fontsize = n["fontsize"] if "fontsize" in n else 5
+
+    # TODO: need to find a better way to specify these locations using the
+    # value of interval
+    grid = get_tick_grid(interval, *axis.get_xlim())
+
+    ha = n["alignment"] if "alignment" in n else "center"
+    if ha == "center":
+        xlocs = grid.midpoints
+    elif ha == "left":
+        xlocs = grid.locations[0:-1]
+    elif ha == "right":
+        xlocs = grid.locations[1:]
+    else:
+        xlocs = grid.midpoints
 
-        # tick_locations = axis.get_xaxis().get_minor_locator()()
-        # tick_locations = axis.get_xaxis().get_major_locator()()
+    if interval == "weeks" and "initial_value" not in n:
+        values = grid.week_numbers[0 : len(xlocs)]
+    else:
+        initial_value = int(n["initial_value"]) if "initial_value" in n else 1
+        values = initial_value + np.arange(len(xlocs))
 
-        ha = n["alignment"] if "alignment" in n else "center"
-        if ha == "center":
-            xlocs = 0.5 * (tick_locations[1:] + tick_locations[0:-1])
-        elif ha == "left":
-            xlocs = tick_locations[0:-1]
-        elif ha == "right":
-            xlocs = tick_locations[1:]
-        else:
-            xlocs = 0.5 * (tick_locations[1:] + tick_locations[0:-1])
-
-        value = int(n["initial_value"]) if "initial_value" in n else 1
-        for t, x in zip(tick_locations, xlocs):
-            if interval == "weeks" and "initial_value" not in n:
-                d = matplotlib.dates.num2date(t)
-                value = int(d.strftime("%W"))
-            plt.text(
-                x, yloc, f"{value}", ha=ha, va=va, fontsize=fontsize, color="#606060"
-            )
-            value += 1
+    return [
+        coords.top_ax.text(
+            x, yloc, label, ha=ha, va=va, fontsize=fontsize, color="#606060"
+        )
+        for x, label in zip(xlocs.tolist(), values.astype(str).tolist())
+    ]
 
 
-def render_events(timeline, fig, coords, ax, verbose=False):
-    events = _get_type(timeline, "event")
-    for name in events:
+def render_numbering(timeline, fig, coords, ax, verbose=False):
+    artists = {}
+    numberings = _get_type(timeline, "numbering")
+    for name in numberings:
         if verbose:
-            print(f"event: {name}")
-        start_dt = timeline[name]["date"]
-        if isinstance(start_dt, datetime.datetime):
-            start_date = start_dt
-        else:
-            start_date = dateutil.parser.parse(timeline[name]["date"])
-        end_date = (
-            dateutil.parser.parse(timeline[name]["end"])
-            if "end" in timeline[name]
-            else None
-        )
-        color = _encode_color(str(timeline[name].get("color", "black")))
-        title_color = _encode_color(str(timeline[name].get("title_color", "black")))
-        note_color = _encode_color(str(timeline[name].get("note_color", "black")))
-        x = coords.get_date_coord(start_date)
-        y = float(timeline[name].get("location", 0.90))
-        wrap = timeline[name].get("wrap", None)
-        if end_date is not None:
+            print(f"numbering: {name}")
+        artists[name] = _draw_numbering(timeline, name, fig, coords, ax)
+    return artists
+
+
+def _draw_event(timeline, name, fig, coords, ax):
+    start_date = _parse_date(timeline[name]["date"])
+    end_date = _parse_date(timeline[name]["end"]) if "end" in timeline[name] else None
+    color = _encode_color(str(timeline[name].get("color", "black")))
+    title_color = _encode_color(str(timeline[name].get("title_color", "black")))
+    note_color = _encode_color(str(timeline[name].get("note_color", "black")))
+    x = coords.get_date_coord(start_date)
+    y = float(timeline[name].get("location", 0.90))
+    wrap = timeline[name].get("wrap", None)
+
+    artists = []
+    if end_date is not None:
+        artists.append(
             ax.axhline(
                 y=1.0,
                 xmin=x,
@@ -366,33 +683,40 @@ def render_events(timeline, fig, coords, ax, verbose=False):
                 color=color,
                 linewidth=6.0,
             )
-        ax.axvline(x=start_date, ymin=y, ymax=1.0, color=color, linewidth=0.5)
-        title = timeline[name].get("title")
-        title_text = plt.text(
-            start_date,
-            y - coords.y_annotation_gap,
-            (title if title is not None else name).encode().decode("unicode_escape"),
-            verticalalignment="top",
-            color=title_color,
-            fontsize=coords.interval_title_fontsize,
         )
+    artists.append(
+        ax.axvline(x=start_date, ymin=y, ymax=1.0, color=color, linewidth=0.5)
+    )
+    if not _encode_boolean(timeline[name].get("label", True)):
+        return artists
+
+    title = timeline[name].get("title")
+    title_text = coords.top_ax.text(
+        start_date,
+        y - coords.y_annotation_gap,
+        (title if title is not None else name).encode().decode("unicode_escape"),
+        verticalalignment="top",
+        color=title_color,
+        fontsize=coords.interval_title_fontsize,
+    )
+    artists.append(title_text)
 
+    with coords.timer("text measurement", items=1):
         r = fig.canvas.get_renderer()
         bb = title_text.get_window_extent(renderer=r)
-        point = ax.transData.inverted().transform(
-            (min(bb.intervalx), min(bb.intervaly))
-        )
-        lower_left = point[1]
-
-        note = timeline[name].get("note")
-        if note is not None:
-            note_text = note.encode().decode("unicode_escape")
-            if wrap is not None:
-                note_text = "\n".join(
-                    textwrap.wrap(note_text, wrap, replace_whitespace=False)
-                )
+    point = ax.transData.inverted().transform((min(bb.intervalx), min(bb.intervaly)))
+    lower_left = point[1]
+
+    note = timeline[name].get("note")
+    if note is not None:
+        note_text = note.encode().decode("unicode_escape")
+        if wrap is not None:
+            note_text = "\n".join(
+                textwrap.wrap(note_text, wrap, replace_whitespace=False)
+            )
 
-            p = plt.text(
+        artists.append(
+            coords.top_ax.text(
                 start_date,
                 lower_left - coords.note_gap,
                 note_text,
@@ -402,7 +726,19 @@ def render_events(timeline, fig, coords, ax, verbose=False):
                 fontstyle="italic",
                 horizontalalignment="left",
             )
-        # print(f"{name}: {start_date} to {end_date}, at {x:0.3f}, {y} in {color}")
+        )
+    # print(f"{name}: {start_date} to {end_date}, at {x:0.3f}, {y} in {color}")
+    return artists
+
+
+def render_events(timeline, fig, coords, ax, verbose=False):
+    artists = {}
+    events = _get_type(timeline, "event")
+    for name in events:
+        if verbose:
+            print(f"event: {name}")
+        artists[name] = _draw_event(timeline, name, fig, coords, ax)
+    return artists
 
 
 def _calculation_duration(duration: str) -> datetime.timedelta:
@@ -415,43 +751,40 @@ def _calculation_duration(duration: str) -> datetime.timedelta:
     return number * timedelta_units
 
 
-def render_intervals(timeline, fig, coords, ax, verbose=False):
+def resolve_intervals(timeline):
+    """Fill in the "start" and "end" of intervals defined relative to other
+    intervals or by a duration.
+    """
     intervals = _get_type(timeline, "interval")
 
-    # define "start" for relatively define intervals
-    defined_intervals = []
-    undefined_intervals = []
-    for name in intervals:
-        if timeline[name].get("start") is None:
-            undefined_intervals.append(name)
-        else:
-            defined_intervals.append(name)
-
-    # extremely naive algorithm to define start for all undefined intervals
-    while len(defined_intervals) < len(intervals):
+    # define "start" for relatively defined intervals, resolving intervals
+    # whose "start_after" interval is already defined on each pass
+    undefined_intervals = [n for n in intervals if timeline[n].get("start") is None]
+    while len(undefined_intervals) > 0:
+        remaining_intervals = []
         for name in undefined_intervals:
             i = timeline[name]
             start_after = i.get("start_after")
-            if start_after is not None:
-                if start_after not in timeline:
-                    raise ParsingError(f"unknown interval '{start_after}'")
-                start_after_end = timeline[start_after].get("end")
-                if start_after_end is None:
-                    start_after_start = timeline[start_after].get("start")
-                    if start_after_start is None:
-                        continue
-                    start_after_duration = timeline[start_after].get("duration")
-                    start_after_end = dateutil.parser.parse(
-                        start_after_start
-                    ) + _calculation_duration(start_after_duration)
-                i["start"] = (
-                    start_after_end
-                    if type(start_after_end) == str
-                    else start_after_end.strftime("%Y-%m-%d")
-                )
-                defined_intervals.append(name)
-            else:
-                print(f"undefined start for interval {name}")
+            if start_after is None:
+                raise ParsingError(f"undefined start for interval '{name}'")
+            if start_after not in timeline:
+                raise ParsingError(f"unknown interval '{start_after}'")
+            start_after_end = timeline[start_after].get("end")
+            if start_after_end is None:
+                start_after_start = timeline[start_after].get("start")
+                if start_after_start is None:
+                    remaining_intervals.append(name)
+                    continue
+                start_after_duration = timeline[start_after].get("duration")
+                start_after_end = _parse_date(
+                    start_after_start
+                ) + _calculation_duration(start_after_duration)
+            i["start"] = _parse_date(start_after_end)
+
+        if len(remaining_intervals) == len(undefined_intervals):
+            names = ", ".join(remaining_intervals)
+            raise ParsingError(f"circular start_after for intervals: {names}")
+        undefined_intervals = remaining_intervals
 
     # define "end" for intervals with duration
     for name in intervals:
@@ -459,25 +792,282 @@ def render_intervals(timeline, fig, coords, ax, verbose=False):
         if i.get("end") is None:
             duration = i.get("duration")
             duration_timedelta = _calculation_duration(duration)
-            start = dateutil.parser.parse(i.get("start"))
-            i["end"] = (start + duration_timedelta).strftime("%Y-%m-%d")
-
-    for name in intervals:
-        i = timeline[name]
-        start = dateutil.parser.parse(i.get("start"))
-        end = dateutil.parser.parse(i.get("end"))
-        if verbose:
-            print(f"interval {name}: {start:%Y-%m-%d} - {end:%Y-%m-%d}")
-        color = _encode_color(str(i.get("color", "black")))
-        title_color = _encode_color(str(timeline[name].get("title_color", "black")))
-        note_color = _encode_color(str(timeline[name].get("note_color", "black")))
-        linewidth = i.get("linewidth", 3.0)
-        linestyle = _encode_linestyle(i.get("linestyle", "solid"))
-
+            i["end"] = _parse_date(i.get("start")) + duration_timedelta
+
+
+def pack_lanes(starts, ends):
+    """Assign intervals to the minimum number of lanes such that intervals in the
+    same lane do not overlap. Intervals are taken in order of their start, using
+    a heap of the ends of the intervals occupying each lane and a heap of free
+    lanes, so packing is O(n log n).
+
+    Parameters
+    ----------
+    starts, ends : array
+        start and end dates of the intervals
+
+    Returns
+    -------
+    tuple
+        array of the lane of each interval and the number of lanes
+    """
+    starts = np.asarray(starts).astype(np.int64)
+    ends = np.asarray(ends).astype(np.int64)
+    lanes = np.empty(len(starts), dtype=int)
+
+    occupied = []  # (end, lane)
+    free = []
+    n_lanes = 0
+    for k in np.argsort(starts, kind="stable").tolist():
+        start = starts[k]
+        while len(occupied) > 0 and occupied[0][0] <= start:
+            heapq.heappush(free, heapq.heappop(occupied)[1])
+        if len(free) > 0:
+            lane = heapq.heappop(free)
+        else:
+            lane = n_lanes
+            n_lanes += 1
+        lanes[k] = lane
+        heapq.heappush(occupied, (ends[k], lane))
+
+    return lanes, n_lanes
+
+
+def layout_lanes(timeline, coords):
+    """Set the location of intervals with ``location: auto``, or without a
+    location if the top-level timeline has ``interval_location: auto``, by
+    packing them into lanes below the ``lanes_top`` of the timeline. If the
+    lanes do not fit between ``lanes_top`` and the bottom of the axes, they are
+    compressed to fit, so their labels may overlap.
+    """
+    top_name = _get_type(timeline, "timeline")[0]
+    default_location = timeline[top_name].get("interval_location")
+    names = [
+        n
+        for n in _get_type(timeline, "interval")
+        if timeline[n].get("location", default_location) == "auto"
+    ]
+    if len(names) == 0:
+        return 0
+
+    arrays = interval_arrays(timeline, coords, names=names)
+    lanes, n_lanes = pack_lanes(arrays.starts, arrays.ends)
+    lane_height = coords.lane_height
+    if n_lanes * lane_height > coords.lanes_top:
+        lane_height = coords.lanes_top / n_lanes
+        warn(f"{n_lanes} lanes of intervals do not fit, labels may overlap")
+    locations = coords.lanes_top - lanes * lane_height
+    for name, location in zip(names, locations.tolist()):
+        timeline[name]["location"] = location
+
+    return n_lanes
+
+
+def item_index(timeline):
+    """Index the dates of the intervals, events, and vertical lines of a resolved
+    timeline.
+    """
+    now = datetime.datetime.now()
+    names, starts, ends = [], [], []
+    for name, item in timeline.items():
+        typename = item.get("type")
+        if typename == "interval":
+            start, end = item["start"], item["end"]
+        elif typename == "event":
+            start = item["date"]
+            end = item.get("end", start)
+        elif typename == "vertical line":
+            start = end = now if item.get("date") == "now" else item["date"]
+        else:
+            continue
+        names.append(name)
+        starts.append(_parse_date(start))
+        ends.append(_parse_date(end))
+    return IntervalIndex(names, _datetime64(starts), _datetime64(ends))
+
+
+def _hidden_items(coords, index):
+    visible = set(index.overlapping(coords.start_date, coords.end_date))
+    return [n for n in index.names if n not in visible]
+
+
+def cull(timeline, coords, index=None):
+    """Remove the intervals, events, and vertical lines of a resolved timeline
+    that lie entirely outside of the dates shown.
+
+    Returns
+    -------
+    int
+        number of items removed
+    """
+    index = item_index(timeline) if index is None else index
+    hidden = _hidden_items(coords, index)
+    for name in hidden:
+        del timeline[name]
+    return len(hidden)
+
+
+_text_to_path = matplotlib.textpath.TextToPath()
+
+
+@functools.lru_cache(maxsize=65536)
+def text_size(text, fontsize, fontstyle="normal"):
+    """Width and height in points of a, possibly multi-line, text label. Sizes are
+    cached, so a label repeated many times is only measured once.
+    """
+    prop = FontProperties(size=fontsize, style=fontstyle)
+    lines = text.split("\n")
+    width = max(
+        _text_to_path.get_text_width_height_descent(line, prop, ismath=False)[0]
+        for line in lines
+    )
+    # matplotlib's default line spacing
+    return width, len(lines) * 1.2 * fontsize
+
+
+def _label_texts(item, name):
+    title = item.get("title")
+    title = (title if title is not None else name).encode().decode("unicode_escape")
+    note = item.get("note")
+    if note is not None:
+        note = note.encode().decode("unicode_escape")
+        wrap = item.get("wrap") if item.get("type") == "event" else None
+        if wrap is not None:
+            note = "\n".join(textwrap.wrap(note, wrap, replace_whitespace=False))
+    return title, note
+
+
+def _merge_subpixel_intervals(timeline, coords):
+    """Merge runs of intervals narrower than a pixel, drawn in the same place and
+    style and separated by less than a pixel, into their first interval. Merged
+    intervals are removed and sub-pixel intervals lose their labels.
+    """
+    axes_width = coords.axes_size[0]
+    arrays = interval_arrays(timeline, coords)
+    xmin = arrays.xmin * axes_width
+    xmax = arrays.xmax * axes_width
+
+    runs = {}
+    for k in np.argsort(arrays.starts, kind="stable").tolist():
+        if xmax[k] - xmin[k] >= 1.0:
+            continue
+        i = timeline[arrays.names[k]]
+        style = (
+            i.get("location", 0.5),
+            i.get("color", "black"),
+            i.get("linewidth", 3.0),
+            i.get("linestyle", "solid"),
+        )
+        run = runs.get(style)
+        if run is not None and xmin[k] - run[1] < 1.0:
+            first = timeline[arrays.names[run[0]]]
+            if arrays.ends[k] > arrays.ends[run[0]]:
+                first["end"] = timeline[arrays.names[k]]["end"]
+                arrays.ends[run[0]] = arrays.ends[k]
+            runs[style] = (run[0], max(run[1], xmax[k]))
+            del timeline[arrays.names[k]]
+        else:
+            i["label"] = False
+            runs[style] = (k, xmax[k])
+
+
+def _suppress_colliding_labels(timeline, coords):
+    """Hide the labels of intervals and events that would overlap the label of
+    another item. Labels of longer items win, and between items of equal length,
+    the item listed first in the timeline wins.
+    """
+    axes_width, axes_height = coords.axes_size
+    pixels_per_point = coords.dpi / 72
+
+    labels = []
+    for order, name in enumerate(timeline):
+        item = timeline[name]
+        if item.get("type") not in ("interval", "event"):
+            continue
+        if not _encode_boolean(item.get("label", True)):
+            continue
+
+        title, note = _label_texts(item, name)
+        width, height = text_size(title, coords.interval_title_fontsize)
+        if note is not None:
+            note_width, note_height = text_size(note, coords.note_fontsize, "italic")
+            width = max(width, note_width)
+            height += note_height + coords.note_gap * axes_height / pixels_per_point
+        width *= pixels_per_point
+        height *= pixels_per_point
+
+        if item["type"] == "interval":
+            start = coords.get_date_coord(_parse_date(item["start"])) * axes_width
+            end = coords.get_date_coord(_parse_date(item["end"])) * axes_width
+            x0 = 0.5 * (start + end) - 0.5 * width
+            top = item.get("location", 0.5) - 2 * coords.y_annotation_gap
+        else:
+            start = coords.get_date_coord(_parse_date(item["date"])) * axes_width
+            end = start
+            if "end" in item:
+                end = coords.get_date_coord(_parse_date(item["end"])) * axes_width
+            x0 = start
+            top = float(item.get("location", 0.90)) - coords.y_annotation_gap
+        y1 = top * axes_height
+        labels.append((-(end - start), order, name, (x0, y1 - height, x0 + width, y1)))
+
+    # boxes of shown labels, by the grid cells they touch
+    cell_size = 64.0
+    cells = collections.defaultdict(list)
+    for _, _, name, box in sorted(labels):
+        x0, y0, x1, y1 = box
+        box_cells = [
+            (i, j)
+            for i in range(int(x0 // cell_size), int(x1 // cell_size) + 1)
+            for j in range(int(y0 // cell_size), int(y1 // cell_size) + 1)
+        ]
+        collides = any(
+            x0 < b[2] and b[0] < x1 and y0 < b[3] and b[1] < y1
+            for c in box_cells
+            for b in cells[c]
+        )
+        if collides:
+            timeline[name]["label"] = False
+        else:
+            for c in box_cells:
+                cells[c].append(box)
+
+
+def level_of_detail(timeline, coords):
+    """Simplify a resolved and culled timeline whose top-level timeline sets
+    ``level_of_detail: true``, by merging intervals narrower than a pixel and
+    hiding the labels that would collide with other labels.
+    """
+    top_name = _get_type(timeline, "timeline")[0]
+    if not _encode_boolean(timeline[top_name].get("level_of_detail", False)):
+        return
+    _merge_subpixel_intervals(timeline, coords)
+    _suppress_colliding_labels(timeline, coords)
+
+
+def _draw_interval(timeline, name, fig, coords, ax, extent=None):
+    """Draw an interval. `extent` optionally gives the precomputed axis
+    coordinates of the start and end along with the date of the middle of the
+    interval.
+    """
+    i = timeline[name]
+    start = _parse_date(i.get("start"))
+    end = _parse_date(i.get("end"))
+    color = _encode_color(str(i.get("color", "black")))
+    title_color = _encode_color(str(timeline[name].get("title_color", "black")))
+    note_color = _encode_color(str(timeline[name].get("note_color", "black")))
+    linewidth = i.get("linewidth", 3.0)
+    linestyle = _encode_linestyle(i.get("linestyle", "solid"))
+
+    if extent is None:
         xmin = coords.get_date_coord(start)
         xmax = coords.get_date_coord(end)
-        y = i.get("location", 0.5)
-        # print(f"{name}: {xmin} to {xmax} at y={y}")
+        middle = start + 0.5 * (end - start)
+    else:
+        xmin, xmax, middle = extent
+    y = i.get("location", 0.5)
+    # print(f"{name}: {xmin} to {xmax} at y={y}")
+    artists = [
         ax.axhline(
             y=y,
             xmin=xmin,
@@ -486,20 +1076,24 @@ def render_intervals(timeline, fig, coords, ax, verbose=False):
             linewidth=linewidth,
             linestyle=linestyle,
         )
+    ]
 
-        annotation_value = i.get("annotation", "")
-        if annotation_value.find("start") >= 0:
-            annotation_format = i.get("annotation_format", "%Y-%m-%d")
-            annotation_text = plt.text(
+    annotation_value = i.get("annotation", "")
+    if annotation_value.find("start") >= 0:
+        annotation_format = i.get("annotation_format", "%Y-%m-%d")
+        artists.append(
+            coords.top_ax.text(
                 start,
                 y + coords.y_annotation_gap,
                 "⇤" + start.strftime(annotation_format),
                 fontsize=coords.annotation_fontsize,
                 color="grey",
             )
-        if annotation_value.find("end") >= 0:
-            annotation_format = i.get("annotation_format", "%Y-%m-%d")
-            annotation_text = plt.text(
+        )
+    if annotation_value.find("end") >= 0:
+        annotation_format = i.get("annotation_format", "%Y-%m-%d")
+        artists.append(
+            coords.top_ax.text(
                 end,
                 y + coords.y_annotation_gap,
                 end.strftime(annotation_format) + "⇥",
@@ -507,29 +1101,34 @@ def render_intervals(timeline, fig, coords, ax, verbose=False):
                 horizontalalignment="right",
                 color="grey",
             )
-
-        title = i.get("title")
-        title_text = plt.text(
-            start + 0.5 * (end - start),
-            y - 2 * coords.y_annotation_gap,
-            (title if title is not None else name).encode().decode("unicode_escape"),
-            fontsize=coords.interval_title_fontsize,
-            verticalalignment="top",
-            horizontalalignment="center",
-            color=title_color,
         )
 
+    if not _encode_boolean(i.get("label", True)):
+        return artists
+
+    title = i.get("title")
+    title_text = coords.top_ax.text(
+        middle,
+        y - 2 * coords.y_annotation_gap,
+        (title if title is not None else name).encode().decode("unicode_escape"),
+        fontsize=coords.interval_title_fontsize,
+        verticalalignment="top",
+        horizontalalignment="center",
+        color=title_color,
+    )
+    artists.append(title_text)
+
+    with coords.timer("text measurement", items=1):
         r = fig.canvas.get_renderer()
         bb = title_text.get_window_extent(renderer=r)
-        point = ax.transData.inverted().transform(
-            (min(bb.intervalx), min(bb.intervaly))
-        )
-        lower_left = point[1]
-
-        note = i.get("note")
-        if note is not None:
-            plt.text(
-                start + 0.5 * (end - start),
+    point = ax.transData.inverted().transform((min(bb.intervalx), min(bb.intervaly)))
+    lower_left = point[1]
+
+    note = i.get("note")
+    if note is not None:
+        artists.append(
+            coords.top_ax.text(
+                middle,
                 lower_left - coords.note_gap,
                 note.encode().decode("unicode_escape"),
                 verticalalignment="top",
@@ -538,47 +1137,466 @@ def render_intervals(timeline, fig, coords, ax, verbose=False):
                 fontstyle="italic",
                 horizontalalignment="center",
             )
+        )
+    return artists
+
+
+def render_intervals(timeline, fig, coords, ax, verbose=False):
+    with coords.timer("interval coordinates"):
+        arrays = interval_arrays(timeline, coords)
+        middles = coords.get_coord_dates(0.5 * (arrays.xmin + arrays.xmax))
+
+    artists = {}
+    for k, name in enumerate(arrays.names):
+        if verbose:
+            start = _parse_date(timeline[name]["start"])
+            end = _parse_date(timeline[name]["end"])
+            print(f"interval {name}: {start:%Y-%m-%d} - {end:%Y-%m-%d}")
+        extent = (arrays.xmin[k], arrays.xmax[k], middles[k])
+        artists[name] = _draw_interval(timeline, name, fig, coords, ax, extent=extent)
+    return artists
+
+
+def _draw_line(timeline, name, fig, coords, ax):
+    v = timeline[name]
+
+    start_name = v.get("date")
+    if start_name == "now":
+        start = datetime.datetime.now()
+    else:
+        start = _parse_date(start_name)
+
+    color = _encode_color(str(v.get("color", "black")))
+    return [ax.axvline(x=start, ymin=0.0, ymax=1.0, color=color, linewidth=1.0)]
 
 
 def render_lines(timeline, fig, coords, ax, verbose=False):
+    artists = {}
     vlines = _get_type(timeline, "vertical line")
     for name in vlines:
         if verbose:
             print(f"line: {name}")
-        v = timeline[name]
+        artists[name] = _draw_line(timeline, name, fig, coords, ax)
+    return artists
 
-        start_name = v.get("date")
-        if start_name == "now":
-            start = datetime.datetime.now()
-        else:
-            start = dateutil.parser.parse(start_name)
 
-        color = _encode_color(str(v.get("color", "black")))
-        ax.axvline(x=start, ymin=0.0, ymax=1.0, color=color, linewidth=1.0)
+DRAW_FUNCTIONS = {
+    "interval": _draw_interval,
+    "event": _draw_event,
+    "vertical line": _draw_line,
+    "numbering": _draw_numbering,
+    "value": _draw_value,
+}
+
+
+class TimelineSession(object):
+    """Long-lived figure of a timeline that can be updated incrementally.
+
+    The session keeps the figure and the artists drawn for each item of the
+    timeline. ``update`` compares a new timeline model to the current one and
+    only removes/redraws the artists of items that changed, so redrawn items end
+    up on top of unchanged ones. Changes to the top-level timeline rebuild the
+    whole figure.
+    """
+
+    def __init__(self, timeline, dpi=None, verbose=False):
+        self.dpi = dpi
+        self.verbose = verbose
+        self._build(self._resolve(timeline))
+
+    def _resolve(self, timeline):
+        timeline = copy.deepcopy(timeline)
+        parse_dates(timeline)
+        resolve_intervals(timeline)
+
+        coords = timeline_coords(timeline, _top_name(timeline))
+        if self.dpi is not None:
+            coords.dpi = self.dpi
+        cull(timeline, coords)
+        layout_lanes(timeline, coords)
+        level_of_detail(timeline, coords)
+        return timeline
+
+    def _build(self, timeline):
+        self.timeline = timeline
+        self.top_name = _top_name(timeline)
+
+        self.coords = timeline_coords(timeline, self.top_name)
+        if self.dpi is not None:
+            self.coords.dpi = self.dpi
+        self.fig, self.ax = setup_plot(timeline, self.coords, self.top_name)
+
+        # draw in the same order as create_figure
+        self.artists = {}
+        for typename in DRAW_FUNCTIONS:
+            for name in _get_type(timeline, typename):
+                self._draw(name)
+
+    def _draw(self, name):
+        draw = DRAW_FUNCTIONS.get(self.timeline[name].get("type"))
+        if draw is None:
+            return
+        if self.verbose:
+            print(f"{self.timeline[name]['type']}: {name}")
+        self.artists[name] = draw(self.timeline, name, self.fig, self.coords, self.ax)
+
+    def _remove(self, name):
+        for artist in self.artists.pop(name, []):
+            artist.remove()
+
+    def update(self, timeline):
+        """Update the figure to show a new timeline model.
+
+        Returns
+        -------
+        set
+            names of the items that were redrawn
+        """
+        new_timeline = self._resolve(timeline)
+
+        top_names = _get_type(new_timeline, "timeline")
+        if top_names != [self.top_name] or (
+            new_timeline[self.top_name] != self.timeline[self.top_name]
+        ):
+            self._build(new_timeline)
+            return set(new_timeline)
+
+        names = set(self.timeline) | set(new_timeline)
+        changed = {n for n in names if self.timeline.get(n) != new_timeline.get(n)}
+
+        for name in changed:
+            self._remove(name)
+
+        self.timeline = new_timeline
+        for name in new_timeline:
+            if name in changed:
+                self._draw(name)
+
+        return changed
+
+    def render(self, format="png"):
+        """Render the current state of the figure to the contents of an output
+        file in the given format.
+        """
+        f = io.BytesIO()
+        write_figure(self.fig, f, format=format.lower())
+        return f.getvalue()
+
+
+def _cache_filename(filename):
+    dirname, basename = os.path.split(filename)
+    return os.path.join(dirname, f".{basename}.timeline-cache")
+
+
+def _file_digest(filename):
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(timeline, format, dpi=None, page_by=None):
+    """Hash of everything that determines the rendered output of a timeline: the
+    normalized timeline model, the epochs and matplotlib versions, and the output
+    format and resolution.
+    """
+    model = json.dumps(timeline, sort_keys=True, default=str)
+    parts = [model, epochs.__version__, matplotlib.__version__, format.lower()]
+    parts.append(str(dpi))
+    if page_by is not None:
+        parts.append(page_by)
+
+    # "now" vertical lines change the output every day
+    if any(item.get("date") == "now" for item in timeline.values()):
+        parts.append(datetime.date.today().isoformat())
+
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def is_cached(timeline, filename, format, dpi=None, page_by=None):
+    """Check whether `filename` already contains the rendered timeline."""
+    if not os.path.isfile(filename):
+        return False
+    try:
+        with open(_cache_filename(filename), "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    if cache.get("key") != cache_key(timeline, format, dpi=dpi, page_by=page_by):
+        return False
+    return cache.get("output") == _file_digest(filename)
+
+
+def write_cache(timeline, filename, format, dpi=None, page_by=None):
+    """Record the cache key of the timeline rendered to `filename`."""
+    cache = {
+        "key": cache_key(timeline, format, dpi=dpi, page_by=page_by),
+        "output": _file_digest(filename),
+    }
+    with open(_cache_filename(filename), "w") as f:
+        json.dump(cache, f)
+
+
+def _filename_format(filename):
+    """Output format given by the extension of a filename, PDF by default."""
+    return os.path.splitext(filename)[1][1:].lower() or "pdf"
+
+
+def write_figure(fig, filename, format="pdf"):
+    """Write a rendered timeline figure. PNG and SVG are written straight from
+    their canvas, other formats go through ``Figure.savefig``.
+    """
+    if format == "png":
+        fig.canvas.print_png(filename)
+    elif format == "svg":
+        canvas = fig.canvas
+        try:
+            FigureCanvasSVG(fig).print_svg(filename)
+        finally:
+            fig.set_canvas(canvas)
+    else:
+        fig.savefig(filename, format=format)
 
 
-def generate(timeline, filename, args, parser):
+def _top_name(timeline):
     top_names = _get_type(timeline, "timeline")
 
     # check to make sure top_name is unique
     if len(top_names) == 0:
-        parser.error("No top-level timeline")
+        raise ParsingError("No top-level timeline")
     elif len(top_names) > 1:
-        parser.error("Top-level timeline not unique")
-    top_name = top_names[0]
+        raise ParsingError("Top-level timeline not unique")
+    return top_names[0]
+
+
+def create_figure(timeline, dpi=None, verbose=False, timer=None):
+    """Create the figure for a timeline without writing it anywhere."""
+    # rendering fills in the start/end of intervals, so leave the caller's model
+    # alone, it still gives the cache key of the output
+    timeline = copy.deepcopy(timeline)
+    top_name = _top_name(timeline)
+
+    timer = StageTimer() if timer is None else timer
+
+    with timer("date parsing", items=len(timeline)):
+        parse_dates(timeline)
+
+    coords = timeline_coords(timeline, top_name, timer=timer)
+    if dpi is not None:
+        coords.dpi = dpi
+
+    with timer("interval resolution", items=len(_get_type(timeline, "interval"))):
+        resolve_intervals(timeline)
 
-    coords = timeline_coords(timeline, top_name)
+    # drop items outside of the dates shown before laying out the rest
+    with timer("culling", items=len(timeline)):
+        cull(timeline, coords)
 
-    fig, ax = setup_plot(timeline, coords, top_name)
+    return _draw_figure(timeline, coords, top_name, timer, verbose=verbose)
 
-    render_intervals(timeline, fig, coords, ax, verbose=args.verbose)
-    render_events(timeline, fig, coords, ax, verbose=args.verbose)
-    render_lines(timeline, fig, coords, ax, verbose=args.verbose)
-    render_numbering(timeline, fig, coords, ax, verbose=args.verbose)
-    render_values(timeline, fig, coords, ax, verbose=args.verbose)
+
+def _draw_figure(timeline, coords, top_name, timer, verbose=False, fig=None):
+    """Lay out and draw a resolved and culled timeline, on `fig` if given."""
+
+    def n_items(typename):
+        return len(_get_type(timeline, typename))
+
+    with timer("layout", items=n_items("interval")):
+        layout_lanes(timeline, coords)
+        level_of_detail(timeline, coords)
+
+    with timer("setup"):
+        fig, ax = setup_plot(timeline, coords, top_name, fig=fig)
+
+    with timer("intervals", items=n_items("interval")):
+        render_intervals(timeline, fig, coords, ax, verbose=verbose)
+    with timer("events", items=n_items("event")):
+        render_events(timeline, fig, coords, ax, verbose=verbose)
+    with timer("lines", items=n_items("vertical line")):
+        render_lines(timeline, fig, coords, ax, verbose=verbose)
+    with timer("numbering", items=n_items("numbering")):
+        render_numbering(timeline, fig, coords, ax, verbose=verbose)
+    with timer("values", items=n_items("value")):
+        render_values(timeline, fig, coords, ax, verbose=verbose)
+
+    return fig
+
+
+PAGE_MONTHS = {"month": 1, "quarter": 3}
+
+
+def page_windows(start_date, end_date, page_by):
+    """Calendar months or quarters covering the dates from `start_date` to
+    `end_date`.
+
+    Returns
+    -------
+    list
+        (label, start, end) of each window, e.g., "2021-03" for a month or
+        "2021Q1" for a quarter
+    """
+    months = PAGE_MONTHS[page_by]
+    month = (start_date.year * 12 + start_date.month - 1) // months * months
+    windows = []
+    while True:
+        start = datetime.datetime(month // 12, month % 12 + 1, 1)
+        if start >= end_date and len(windows) > 0:
+            break
+        month += months
+        end = datetime.datetime(month // 12, month % 12 + 1, 1)
+        if page_by == "month":
+            label = f"{start:%Y-%m}"
+        else:
+            label = f"{start.year}Q{start.month // 3 + 1}"
+        windows.append((label, start, end))
+    return windows
+
+
+def create_pages(timeline, page_by, dpi=None, verbose=False, timer=None):
+    """Create the figures for a timeline split into calendar months or quarters.
+
+    The timeline model is resolved and indexed once, and the items of each page
+    are selected from the index. The same figure is redrawn for each page, so
+    write each page before asking for the next one.
+
+    Yields
+    ------
+    tuple
+        (label, figure) for each page
+    """
+    timeline = copy.deepcopy(timeline)
+    top_name = _top_name(timeline)
+
+    timer = StageTimer() if timer is None else timer
+
+    with timer("date parsing", items=len(timeline)):
+        parse_dates(timeline)
+    with timer("interval resolution", items=len(_get_type(timeline, "interval"))):
+        resolve_intervals(timeline)
+    with timer("indexing", items=len(timeline)):
+        index = item_index(timeline)
+    indexed = set(index.names)
+
+    top = timeline[top_name]
+    windows = page_windows(_parse_date(top["start"]), _parse_date(top["end"]), page_by)
+    fig = None
+    for label, start, end in windows:
+        with timer("culling"):
+            page_top = dict(top, start=start, end=end)
+            coords = timeline_coords({top_name: page_top}, top_name, timer=timer)
+            if dpi is not None:
+                coords.dpi = dpi
+            visible = set(index.overlapping(start, end))
+
+            # layout changes items, so copy the items shown on the page
+            page = {}
+            for name, item in timeline.items():
+                if name == top_name:
+                    page[name] = page_top
+                elif name in visible or name not in indexed:
+                    page[name] = dict(item)
+
+        fig = _draw_figure(page, coords, top_name, timer, verbose=verbose, fig=fig)
+        yield label, fig
+
+
+def write_pages(
+    timeline, filename, page_by, format="pdf", dpi=None, verbose=False, timer=None
+):
+    """Write a timeline split into calendar months or quarters. PDF output is a
+    single multi-page file, other formats are written to one file per page with
+    the label of the page added to `filename`, e.g., "timeline-2021Q1.png".
+
+    Returns
+    -------
+    list
+        filenames written
+    """
+    timer = StageTimer() if timer is None else timer
+    pages = create_pages(timeline, page_by, dpi=dpi, verbose=verbose, timer=timer)
+
+    if format == "pdf":
+        with PdfPages(filename) as pdf:
+            for label, fig in pages:
+                with timer("write"):
+                    fig.savefig(pdf, format="pdf")
+        return [filename]
+
+    root, ext = os.path.splitext(filename)
+    filenames = []
+    for label, fig in pages:
+        page_filename = f"{root}-{label}{ext}"
+        with timer("write"):
+            write_figure(fig, page_filename, format=format)
+        filenames.append(page_filename)
+    return filenames
+
+
+def render(timeline, format="pdf", dpi=None, verbose=False, timer=None):
+    """Render a timeline to the contents of an output file in the given format.
+
+    Problems in the timeline raise ``ParsingError`` and nothing is written to
+    disk. No pyplot state is used, so timelines can be rendered concurrently from
+    several threads.
+    """
+    timer = StageTimer() if timer is None else timer
+    fig = create_figure(timeline, dpi=dpi, verbose=verbose, timer=timer)
+
+    with timer("write"):
+        f = io.BytesIO()
+        write_figure(fig, f, format=format.lower())
+
+    return f.getvalue()
+
+
+async def arender(timeline, format="pdf", dpi=None, verbose=False, executor=None):
+    """Coroutine version of ``render``, rendering in an executor, see
+    ``epochs.aio``.
+    """
+    return await aio.run(
+        render, timeline, format=format, dpi=dpi, verbose=verbose, executor=executor
+    )
+
+
+def generate(timeline, filename, args, parser, timer=None):
+    try:
+        _top_name(timeline)
+    except ParsingError as e:
+        parser.error(str(e))
+
+    timer = StageTimer() if timer is None else timer
+
+    # arguments added after generate was introduced are optional for callers
+    # passing their own namespace
+    format = getattr(args, "format", None) or _filename_format(filename)
+    dpi = getattr(args, "dpi", None)
+    page_by = getattr(args, "page_by", None)
+
+    if page_by is not None:
+        write_pages(
+            timeline,
+            filename,
+            page_by,
+            format=format,
+            dpi=dpi,
+            verbose=args.verbose,
+            timer=timer,
+        )
+        return timer
+
+    fig = create_figure(timeline, dpi=dpi, verbose=args.verbose, timer=timer)
 
     # write timeline output
-    plt.savefig(filename)
+    with timer("write"):
+        write_figure(fig, filename, format=format)
+
+    return timer
 
 
 def main():
@@ -587,26 +1605,83 @@ def main():
     parser.add_argument("-v", "--version", action="version", version=name)
     parser.add_argument("filename", help="YAML input filename")
     parser.add_argument("-o", "--output", help="output filename")
+    parser.add_argument(
+        "-f",
+        "--format",
+        help="output format, i.e., pdf, png, svg, etc.; default from output filename",
+    )
+    parser.add_argument("--dpi", help="resolution of raster output", type=float)
     parser.add_argument("--verbose", help="output warnings", action="store_true")
+    parser.add_argument(
+        "--force",
+        help="render even if the output is up-to-date with the input",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile", help="report time spent in each stage", action="store_true"
+    )
+    parser.add_argument("--cache-dir", help="directory to cache parsed YAML files")
+    parser.add_argument(
+        "--page-by",
+        help="split output into a page per calendar month or quarter; pages are "
+        "written to a single PDF or to one file per page for other formats",
+        choices=list(PAGE_MONTHS),
+    )
     args = parser.parse_args()
 
+    if args.verbose or args.profile:
+        print(f"YAML loader: {YAML_LOADER}")
+        if YAML_LOADER != "CLoader":
+            warn("libyaml not available, using the much slower pure Python loader")
+
+    timer = StageTimer()
+
     try:
-        timeline = load(args.filename)
+        with timer("load"):
+            timeline = load(args.filename, cache_dir=args.cache_dir)
     except FileNotFoundError:
         parser.error(f"file not found: {args.filename}")
 
     if args.output is None:
-        output_filename = os.path.splitext(args.filename)[0] + ".pdf"
+        args.format = "pdf" if args.format is None else args.format.lower()
+        output_filename = os.path.splitext(args.filename)[0] + "." + args.format
     else:
         output_filename = args.output
+        if args.format is None:
+            args.format = _filename_format(output_filename)
+        else:
+            args.format = args.format.lower()
+
+    # pages written to separate files are not cached
+    cached = args.page_by is None or args.format == "pdf"
+
+    if (
+        cached
+        and not args.force
+        and is_cached(
+            timeline, output_filename, args.format, dpi=args.dpi, page_by=args.page_by
+        )
+    ):
+        if args.verbose:
+            print(f"{output_filename} is up-to-date, skipping")
+        return
 
     if not args.verbose:
         warnings.filterwarnings("ignore")
 
     try:
-        generate(timeline, output_filename, args, parser)
+        generate(timeline, output_filename, args, parser, timer=timer)
     except ParsingError as e:
         print(f"exiting with fatal error: {e}")
+        return
+
+    if cached:
+        write_cache(
+            timeline, output_filename, args.format, dpi=args.dpi, page_by=args.page_by
+        )
+
+    if args.profile:
+        timer.report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `epochs.cli` module."""
+
+import contextlib
+import csv
+import io
+import json
+import os
+import pytest
+
+from epochs import cli
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(CURRENT_DIR)
+DATA_DIR = os.path.join(REPO_DIR, "data")
+
+FORMATS = "%Y%m%d,%Y%m%d.%H%M%S"
+
+
+def _data(filename):
+    return os.path.join(DATA_DIR, filename)
+
+
+def _error(capsys, argv):
+    with pytest.raises(SystemExit):
+        cli.main(argv)
+    return capsys.readouterr().err
+
+
+def test_invalid_date(capsys):
+    argv = [_data("epochs_format.cfg"), "--formats", FORMATS, "-d", "2018-01-02"]
+    assert "does not match any of the formats" in _error(capsys, argv)
+
+
+def test_invalid_formats(capsys):
+    argv = [_data("epochs_format.cfg"), "--formats", "%Y%m%d"]
+    assert "invalid section date" in _error(capsys, argv)
+
+
+def test_file_not_found(capsys):
+    assert "file not found" in _error(capsys, [_data("missing.cfg")])
+
+
+def _output(capsys, argv):
+    cli.main(argv)
+    return capsys.readouterr().out
+
+
+def test_trace(capsys):
+    output = _output(capsys, [_data("epochs.cfg"), "-s", _data("epochs_spec.cfg")])
+    assert output == (
+        "[2018-01-01]\n"
+        "cal_version: 1\n"
+        "\n"
+        "[2018-01-01 08:00:00]\n"
+        "cal_version: 2\n"
+        "\n"
+        "[2018-01-03]\n"
+        "cal_version: 3\n"
+    )
+
+
+def test_date(capsys):
+    argv = [_data("epochs_format.cfg"), "-s", _data("epochs_spec.cfg")]
+    argv += ["--formats", FORMATS, "-d", "20180102", "-o", "cal_version,nx"]
+    assert _output(capsys, argv) == "cal_version: 2\nnx: 1024\n"
+
+
+def test_formats(capsys):
+    argv = [_data("epochs.cfg"), "-s", _data("epochs_spec.cfg")]
+
+    text = _output(capsys, argv + ["-f", "text"])
+    assert text.splitlines()[:2] == ["[2018-01-01]", "cal_version: 1"]
+
+    records = json.loads(_output(capsys, argv + ["-f", "json"]))
+    assert [r["value"] for r in records] == [1, 2, 3]
+
+    lines = _output(capsys, argv + ["-f", "ndjson"]).splitlines()
+    assert [json.loads(line) for line in lines] == records
+
+    rows = list(csv.reader(io.StringIO(_output(capsys, argv + ["-f", "csv"]))))
+    assert rows[0] == cli.FIELDS
+    assert rows[1] == ["2018-01-01", "2018-01-01T00:00:00", "cal_version", "1"]
+
+
+def test_formats_empty(capsys):
+    argv = [_data("epochs.cfg"), "-o", "dist_filename"]
+    assert json.loads(_output(capsys, argv + ["-f", "json"])) == []
+    assert _output(capsys, argv + ["-f", "ndjson"]) == ""
+    assert _output(capsys, argv + ["-f", "csv"]) == ",".join(cli.FIELDS) + "\n"
+
+
+def test_csv_missing_value(capsys):
+    argv = [_data("epochs.cfg"), "-s", _data("epochs_spec.cfg"), "-f", "csv"]
+    output = _output(capsys, argv + ["-d", "2018-01-02", "-o", "dist_filename"])
+    rows = list(csv.reader(io.StringIO(output)))
+    assert rows[1] == ["", "2018-01-02T00:00:00", "dist_filename", ""]
+
+
+def test_redirect_stdout():
+    f = io.StringIO()
+    with contextlib.redirect_stdout(f):
+        cli.main([_data("epochs.cfg"), "-o", "cal_version"])
+    assert f.getvalue().startswith("[2018-01-01]\n")
+
+
+def test_diff_files(capsys):
+    argv = ["diff", _data("epochs.cfg"), _data("epochs_changed.cfg")]
+    argv += ["-s", _data("epochs_spec.cfg")]
+    assert _output(capsys, argv) == (
+        "[cal_version]\n"
+        "2018-01-02T00:00:00 to 2018-01-03T00:00:00: 2 -> 5\n"
+        "\n"
+        "[dist_filename]\n"
+        "2018-01-03T00:00:00 to ...: None -> dist-3.ncdf\n"
+    )
+
+    rows = list(csv.reader(io.StringIO(_output(capsys, argv + ["-f", "csv"]))))
+    assert rows[0] == cli.DIFF_FIELDS
+    assert rows[2] == ["dist_filename", "2018-01-03T00:00:00", "", "", "dist-3.ncdf"]
+
+
+def test_diff_dates(capsys):
+    argv = ["diff", _data("epochs.cfg"), "-s", _data("epochs_spec.cfg")]
+    argv += ["-d", "2018-01-01", "-d", "2018-01-03"]
+    assert _output(capsys, argv) == "cal_version: 1 -> 3\n"
+
+    records = json.loads(_output(capsys, argv + ["-f", "json"]))
+    assert records == [
+        {
+            "option": "cal_version",
+            "date": "2018-01-01T00:00:00",
+            "value": 1,
+            "other_date": "2018-01-03T00:00:00",
+            "other_value": 3,
+        }
+    ]
+
+
+def test_diff_dates_formats(capsys):
+    argv = ["diff", _data("epochs_format.cfg"), "--formats", FORMATS]
+    argv += ["-s", _data("epochs_spec.cfg")]
+    assert _output(capsys, argv + ["-d", "20180101", "-d", "20180103"]) == (
+        "cal_version: 1 -> 3\n"
+    )
+    assert _output(capsys, argv + ["-d", "20180101.090000", "-d", "20180102"]) == ""
+
+    error = _error(capsys, argv + ["-d", "20180101", "-d", "2018-01-03"])
+    assert "does not match any of the formats" in error
+
+
+def test_diff_usage(capsys):
+    assert "two dates" in _error(capsys, ["diff", _data("epochs.cfg")])
+
+
+def test_convert(tmp_path, capsys):
+    store_filename = str(tmp_path / "kcor.store")
+    argv = ["convert", _data("kcor.epochs.cfg"), store_filename]
+    cli.main(argv + ["--formats", FORMATS, "--timezone", "HST"])
+
+    argv = [store_filename, "-s", _data("kcor.epochs.spec.cfg"), "-o", "cmin"]
+    assert _output(capsys, argv).splitlines()[:2] == [
+        "[20130930.084301]",
+        "cmin: 300000.0",
+    ]
+
+    argv = [_data("kcor.epochs.cfg"), "-s", _data("kcor.epochs.spec.cfg")]
+    argv += ["--formats", FORMATS, "--timezone", "HST"]
+    assert _output(capsys, [store_filename] + argv[1:]) == _output(capsys, argv)
+
+
+def test_convert_usage(tmp_path, capsys):
+    argv = ["convert", _data("missing.cfg"), str(tmp_path / "missing.store")]
+    assert "file not found" in _error(capsys, argv)
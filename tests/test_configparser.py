@@ -3,8 +3,12 @@
 
 """Tests for `epochs` package."""
 
+import asyncio
+import concurrent.futures
+import datetime
 import os
 import pytest
+import sys
 
 import epochs
 
@@ -254,6 +258,119 @@ def test_epoch_parser_interp():
     assert dist_filename == "/export/data1/Data/dist-1.ncdf"
 
 
+def test_epochparser_set():
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    ep.read(os.path.join(DATA_DIR, "epochs_interp.cfg"))
+    view = ep.view
+
+    with epochs.collect_stats() as stats:
+        ep.set("DEFAULT", "root_dir", "/data")
+    # only root_dir in the four epochs and the dist_filename referring to it are
+    # resolved again, each with a second get for interpolation
+    gets = stats.as_dict()["calls"]["ConfigParser.get"]
+    assert gets["root_dir"]["count"] == 8
+    assert gets["dist_filename"]["count"] == 2
+    assert "cal_version" not in gets
+
+    assert ep.get("dist_filename", "2018-01-02") == "/data/dist-1.ncdf"
+    assert view.get("dist_filename", "2018-01-02") == "/export/data1/Data/dist-1.ncdf"
+
+    ep.set("2018-01-03", "dist_filename", "%(root_dir)s/dist-3.ncdf")
+    assert ep.get("dist_filename", "2018-01-02") == "/data/dist-1.ncdf"
+    assert ep.get("dist_filename", "2018-01-03") == "/data/dist-3.ncdf"
+    assert ep.interval("dist_filename", "2018-01-01")[1] == datetime.datetime(
+        2018, 1, 3
+    )
+
+    ep.set("2018-01-04", "cal_version", "4")
+    assert ep.get("cal_version", "2018-01-05") == 4
+    assert len(ep.epochs()) == 5
+
+    # the config is a copy, changing it does not change the view
+    config = ep.config
+    config.set("2018-01-04", "cal_version", "5")
+    assert ep.get("cal_version", "2018-01-05") == 4
+    assert ep.view.config.get("2018-01-04", "cal_version") == "4"
+
+
+def test_epochparser_shared_values(tmp_path):
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "kcor.epochs.spec.cfg"))
+    ep.formats = ["%Y%m%d", "%Y%m%d.%H%M%S"]
+    with epochs.collect_stats() as stats:
+        ep.read(os.path.join(DATA_DIR, "kcor.epochs.cfg"))
+
+    memory = ep.memory_stats()
+    assert memory["unique_values"] < memory["values"]
+    assert memory["bytes_saved"] > 0
+    assert stats.as_dict()["caches"]["values"]["hits"] > 0
+
+    names = [o for e in ep.view.config.sections() for o in ep.view.config.options(e)]
+    assert all(n is sys.intern(n) for n in names)
+
+    # identical raw values are shared between sections
+    raw = {}
+    for values in ep.view.config._sections.values():
+        for v in values.values():
+            assert raw.setdefault(v, v) is v
+
+    # shared lists are copied when returned
+    lines = ep.get("horizontal_artifact_lines", "20180101")
+    assert lines == [753]
+    lines.append(754)
+    assert ep.get("horizontal_artifact_lines", "20180101") == [753]
+
+    # only the shared option name counts, Python shares the value anyway
+    filename = tmp_path / "epochs.cfg"
+    filename.write_text("[2018-01-01]\nnx : 7\n\n[2018-01-02]\nnx : 7\n")
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    ep.read(str(filename))
+    assert ep.memory_stats()["bytes_saved"] == sys.getsizeof("nx")
+
+
+def test_epochparser_materialize_days():
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    ep.read(os.path.join(DATA_DIR, "epochs.cfg"))
+    ep.materialize_days("2017-12-30", "2018-01-03")
+
+    with epochs.collect_stats() as stats:
+        assert ep.get("cal_version", "2017-12-31") == 0
+        assert ep.get("cal_version", "2018-01-03 06:00:00") == 3
+        # an epoch starts after midnight on 2018-01-01
+        assert ep.get("cal_version", "2018-01-01 10:00:00") == 2
+        assert ep.get("cal_version", "2018-01-01 06:00:00") == 1
+        # outside of the range of days
+        assert ep.get("cal_version", "2018-01-05") == 3
+    caches = stats.as_dict()["caches"]
+    assert caches["days"]["hits"] == 2
+    assert caches["days"]["misses"] == 3
+
+    # the table is rebuilt for the new view
+    ep.set("2018-01-03", "cal_version", "5")
+    assert ep.get("cal_version", "2018-01-03 12:00:00") == 5
+
+    with pytest.raises(ValueError):
+        ep.materialize_days("2000-01-01", "2018-01-01", max_days=365)
+
+    # aware dates can not be compared to naive epochs, with or without the table
+    aware = datetime.datetime(2017, 12, 31, tzinfo=datetime.timezone.utc)
+    with pytest.raises(TypeError):
+        ep.get("cal_version", aware)
+
+
+def test_epochparser_set_before_read():
+    ep = epochs.EpochConfigParser()
+    ep.set("DEFAULT", "root_dir", "/data")
+    ep.read(os.path.join(DATA_DIR, "epochs_interp.cfg"))
+
+    # the default set before reading is kept, the file overrides it
+    assert ep.get("root_dir", "2018-01-02") == "/export/data1/Data"
+
+    ep = epochs.EpochConfigParser()
+    ep.set("DEFAULT", "extra", "1")
+    ep.read(os.path.join(DATA_DIR, "epochs.cfg"))
+    assert ep.get("extra", "2018-01-02") == "1"
+
+
 def test_epoch_parser_format():
     ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
     ep.formats = ["%Y%m%d", "%Y%m%d.%H%M%S"]
@@ -280,6 +397,16 @@ def test_epoch_parser_format():
     assert cal_version == 3
 
 
+def test_epoch_parser_format_after_read():
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    ep.read(os.path.join(DATA_DIR, "epochs_format.cfg"))
+    with pytest.raises(ValueError):
+        ep.get("cal_version", "20171231")
+
+    ep.formats = ["%Y%m%d", "%Y%m%d.%H%M%S"]
+    assert ep.get("cal_version", "20180101.100000") == 2
+
+
 def test_kcor():
     ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "kcor.epochs.spec.cfg"))
     ep.formats = ["%Y%m%d", "%Y%m%d.%H%M%S"]
@@ -292,3 +419,223 @@ def test_kcor():
     dist = ep.get("distortion_correction_filename", "20190307.000000")
     assert type(dist) == str
     assert dist == "dist_coeff_20190308_185649_dot1.sav"
+
+
+def test_epochparser_trace():
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    ep.read(os.path.join(DATA_DIR, "epochs.cfg"))
+
+    changes = list(ep.trace(["cal_version"]))
+    assert [c[1] for c in changes] == [
+        "2018-01-01",
+        "2018-01-01 08:00:00",
+        "2018-01-03",
+    ]
+    assert [c[3] for c in changes] == [1, 2, 3]
+
+
+def test_epochparser_get_all():
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    ep.read(os.path.join(DATA_DIR, "epochs_interp.cfg"))
+
+    values = ep.get_all("2018-01-02")
+    assert values["cal_version"] == 2
+    assert values["dist_filename"] == "/export/data1/Data/dist-1.ncdf"
+
+    values = ep.get_all("2017-12-31", ["cal_version"])
+    assert values == {"cal_version": 0}
+
+
+def test_epochparser_diff():
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    ep.read(os.path.join(DATA_DIR, "epochs.cfg"))
+
+    other = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    other.read(os.path.join(DATA_DIR, "epochs_changed.cfg"))
+
+    differences = ep.diff(other)
+    assert len(differences) == 2
+
+    assert differences[0].option == "cal_version"
+    assert differences[0].start == datetime.datetime(2018, 1, 2)
+    assert differences[0].end == datetime.datetime(2018, 1, 3)
+    assert differences[0].value == 2
+    assert differences[0].other_value == 5
+
+    assert differences[1].option == "dist_filename"
+    assert differences[1].start == datetime.datetime(2018, 1, 3)
+    assert differences[1].end is None
+
+    assert ep.diff(ep) == []
+
+
+def test_epochparser_diff_dates():
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    ep.read(os.path.join(DATA_DIR, "epochs.cfg"))
+
+    differences = ep.diff_dates("2018-01-01 06:00:00", "2018-01-03")
+    assert differences == {"cal_version": (1, 3)}
+
+
+def test_epochparser_interval():
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    ep.read(os.path.join(DATA_DIR, "epochs.cfg"))
+
+    start, end = ep.interval("cal_version", "2018-01-01 08:00:00")
+    assert start == datetime.datetime(2018, 1, 1, 8)
+    assert end == datetime.datetime(2018, 1, 3)
+
+    # epoch not setting the option
+    start, end = ep.interval("cal_version", "2018-01-02 08:00:00")
+    assert start == datetime.datetime(2018, 1, 2, 8)
+    assert end == datetime.datetime(2018, 1, 3)
+
+    start, end = ep.interval("cal_version", "2018-01-03")
+    assert end is None
+
+    intervals = ep.intervals("2018-01-01", ["cal_version", "nx"])
+    assert intervals["cal_version"][1] == datetime.datetime(2018, 1, 1, 8)
+    assert intervals["nx"][1] is None
+
+
+def test_epochparser_view():
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    ep.read(os.path.join(DATA_DIR, "epochs.cfg"))
+
+    view = ep.view
+    ep.read(os.path.join(DATA_DIR, "epochs_changed.cfg"))
+
+    # reading swaps in a new view, leaving the old one untouched
+    assert ep.view is not view
+    assert view.get("dist_filename", "2018-01-03") is None
+    assert view.get_all("2018-01-02 12:00:00")["cal_version"] == 2
+    assert ep.get("dist_filename", "2018-01-03") == "dist-3.ncdf"
+    assert ep.get("cal_version", "2018-01-02 12:00:00") == 5
+
+
+def test_epochparser_aread():
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    filename = os.path.join(DATA_DIR, "epochs.cfg")
+
+    async def read_concurrently():
+        return await asyncio.gather(*[ep.aread(filename) for i in range(5)])
+
+    with epochs.collect_stats() as stats:
+        results = asyncio.run(read_concurrently())
+
+    assert results == [[filename]] * 5
+    # concurrent reads of the same file are coalesced
+    assert len(stats.reads) == 1
+    assert ep.get("cal_version", "2018-01-02") == 2
+
+
+def test_epochparser_aread_different_files(tmp_path):
+    filenames = []
+    for day in range(1, 9):
+        filename = tmp_path / f"epochs-{day}.cfg"
+        filename.write_text(f"[2018-01-{day:02d}]\ncal_version : {day}\n")
+        filenames.append(str(filename))
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+
+    async def read_concurrently(executor):
+        return await asyncio.gather(
+            *[ep.aread(f, executor=executor) for f in filenames]
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        results = asyncio.run(read_concurrently(executor))
+
+    assert results == [[f] for f in filenames]
+    # each read adds to the config left by the others
+    assert len(ep.epochs()) == 8
+    for day in range(1, 9):
+        assert ep.get("cal_version", f"2018-01-{day:02d}") == day
+
+
+def test_configparser_aread():
+    cp = epochs.ConfigParser(os.path.join(DATA_DIR, "spec.cfg"))
+    filename = os.path.join(DATA_DIR, "user.cfg")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        read_ok = asyncio.run(cp.aread(filename, executor=executor))
+    assert read_ok == [filename]
+    assert cp.sections() == ["logging", "level1"]
+
+    cp = epochs.ConfigParser()
+    filenames = [os.path.join(DATA_DIR, f) for f in ["epochs.cfg", "user.cfg"]]
+
+    async def read_concurrently(executor):
+        return await asyncio.gather(
+            *[cp.aread(f, executor=executor) for f in filenames]
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        results = asyncio.run(read_concurrently(executor))
+    assert results == [[f] for f in filenames]
+    assert len(cp.sections()) == 6
+
+
+def test_epochparser_to_table():
+    np = pytest.importorskip("numpy")
+
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    ep.read(os.path.join(DATA_DIR, "epochs_changed.cfg"))
+
+    table = ep.to_table()
+    assert table.dtype.names == ("epoch", "nx", "ny", "cal_version", "dist_filename")
+    assert table.dtype["cal_version"] == np.int64
+    assert table["epoch"][0] == np.datetime64("2018-01-01")
+    assert table["cal_version"].tolist() == [1, 2, 5, 3]
+    # values are carried forward and options without a value are masked
+    assert table["nx"].tolist() == [1024] * 4
+    assert table["dist_filename"].mask.tolist() == [True, True, True, False]
+    assert table["dist_filename"][3] == "dist-3.ncdf"
+
+
+def test_epochparser_to_arrow():
+    pa = pytest.importorskip("pyarrow")
+
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+    ep.read(os.path.join(DATA_DIR, "epochs_changed.cfg"))
+
+    table = ep.to_table(["cal_version", "dist_filename"], kind="arrow")
+    assert table.schema.field("cal_version").type == pa.int64()
+    assert table.column("dist_filename").null_count == 3
+
+
+def test_epochparser_timezone():
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "kcor.epochs.spec.cfg"))
+    ep.formats = ["%Y%m%d", "%Y%m%d.%H%M%S"]
+    ep.timezone = "HST"
+    ep.read(os.path.join(DATA_DIR, "kcor.epochs.cfg"))
+
+    utc = datetime.timezone.utc
+    assert ep.epochs()[0] == datetime.datetime(2013, 9, 30, 18, 43, 1, tzinfo=utc)
+    assert ep.get("cmin", datetime.datetime(2013, 9, 30, 18, 43, tzinfo=utc)) == 200.0
+    # naive dates are in the time zone of the epochs
+    assert ep.get("cmin", "20130930.084301") == 300000.0
+
+    with pytest.raises(ValueError):
+        ep.timezone = "Not/AZone"
+
+
+def test_collect_stats():
+    with epochs.collect_stats() as stats:
+        ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, "epochs_spec.cfg"))
+        ep.read(os.path.join(DATA_DIR, "epochs.cfg"))
+        for d in ["2017-12-31", "2018-01-01 10:00:00", "2018-01-03 06:00:00"]:
+            ep.get("cal_version", d)
+
+    ep.get("cal_version", "2018-01-02")  # not collected
+
+    stats = stats.as_dict()
+    assert stats["calls"]["EpochConfigParser.get"]["cal_version"]["count"] == 3
+    # values are resolved once per epoch when reading, interpolation looks up
+    # the raw value with a second get
+    assert stats["calls"]["ConfigParser.get"]["cal_version"]["count"] == 6
+    # three spec defaults and the values of the three epochs
+    assert stats["calls"]["_convert"]["int"]["count"] == 6
+    # the empty view of the new parser and the view after reading
+    assert stats["calls"]["EpochView"]["build"]["count"] == 2
+    assert len(stats["reads"]) == 1
+    assert epochs.configparser._stats is None
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `epochs.store` module."""
+
+import datetime
+import os
+import pytest
+
+import epochs
+from epochs import store
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(CURRENT_DIR)
+DATA_DIR = os.path.join(REPO_DIR, "data")
+
+
+def _parsers(tmp_path, spec, filename, formats=None):
+    ep = epochs.EpochConfigParser(os.path.join(DATA_DIR, spec))
+    ep.formats = formats
+    ep.read(os.path.join(DATA_DIR, filename))
+
+    store_filename = str(tmp_path / "epochs.store")
+    store.write_store(ep.view, store_filename)
+    assert store.is_store(store_filename)
+
+    sp = epochs.EpochConfigParser(os.path.join(DATA_DIR, spec))
+    sp.formats = formats
+    sp.open_store(store_filename)
+    return ep, sp
+
+
+def test_store(tmp_path):
+    ep, sp = _parsers(tmp_path, "epochs_spec.cfg", "epochs_changed.cfg")
+
+    assert sp.epochs() == ep.epochs()
+    assert sp.options() == ep.options()
+    assert sp.get("cal_version", "2018-01-02 12:00:00") == 5
+    assert sp.get("cal_version", "2017-12-31") == 0
+    assert sp.get("dist_filename", "2018-01-03") == "dist-3.ncdf"
+    assert sp.interval("cal_version", "2018-01-01 08:00:00") == (
+        datetime.datetime(2018, 1, 1, 8),
+        datetime.datetime(2018, 1, 2),
+    )
+    assert sp.get_all("2018-01-02") == ep.get_all("2018-01-02")
+    assert list(sp.trace()) == list(ep.trace())
+    assert sp.diff(ep) == []
+
+
+def test_store_formats(tmp_path):
+    ep, sp = _parsers(
+        tmp_path,
+        "kcor.epochs.spec.cfg",
+        "kcor.epochs.cfg",
+        formats=["%Y%m%d", "%Y%m%d.%H%M%S"],
+    )
+
+    assert list(sp.trace()) == list(ep.trace())
+    assert sp.view.columns() == ep.view.columns()
+    for d in ["20130930.084301", "20150101", "20190306.235959"]:
+        assert sp.get_all(d) == ep.get_all(d)
+
+
+def test_store_invalid(tmp_path):
+    filename = os.path.join(DATA_DIR, "epochs.cfg")
+    assert not store.is_store(filename)
+
+    ep = epochs.EpochConfigParser()
+    with pytest.raises(ValueError):
+        ep.open_store(filename)
+
+
+def test_store_materialize_days(tmp_path):
+    ep, sp = _parsers(
+        tmp_path,
+        "kcor.epochs.spec.cfg",
+        "kcor.epochs.cfg",
+        formats=["%Y%m%d", "%Y%m%d.%H%M%S"],
+    )
+    sp.materialize_days("20130901", "20191231")
+    for d in ["20130930.084301", "20150101", "20190306.235959", "20200101"]:
+        assert sp.get("cmin", d) == ep.get("cmin", d)
+
+    # aware dates can not be compared to the naive epochs of the store
+    aware = datetime.datetime(2015, 1, 1, tzinfo=datetime.timezone.utc)
+    for p in [ep, sp, sp.view]:
+        with pytest.raises(TypeError):
+            p.get("cmin", aware)
+    with pytest.raises(TypeError):
+        sp.view.get_all(aware)
+
+    for p in [ep, sp]:
+        with pytest.raises(ValueError, match="does not match any of the formats"):
+            p.get("cmin", "2015-01-01")
+    with pytest.raises(ValueError, match="does not match any of the formats"):
+        sp.view.get("cmin", "2015-01-01")
@@ -0,0 +1,540 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `epochs.timeline` module."""
+
+import argparse
+import datetime
+import io
+import os
+import struct
+import sys
+
+import matplotlib.dates as mdates
+import numpy as np
+import pytest
+
+from epochs import timeline
+
+TIMELINE = """\
+Schedule:
+  type: timeline
+  start: 01-01-2020
+  end: 03-01-2020
+
+Setup:
+  type: interval
+  start: 01-06-2020
+  duration: 2 weeks
+
+Season:
+  type: interval
+  start_after: Setup
+  duration: 3 weeks
+"""
+
+
+def _write_timeline(tmp_path, text=TIMELINE):
+    filename = tmp_path / "schedule.yaml"
+    filename.write_text(text)
+    return str(filename)
+
+
+def _main(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["timeline", *args])
+    timeline.main()
+
+
+def test_main_up_to_date(tmp_path, monkeypatch, capsys):
+    filename = _write_timeline(tmp_path)
+    output_filename = str(tmp_path / "schedule.png")
+
+    _main(monkeypatch, filename, "-o", output_filename, "--verbose")
+    assert "up-to-date" not in capsys.readouterr().out
+
+    _main(monkeypatch, filename, "-o", output_filename, "--verbose")
+    assert "up-to-date" in capsys.readouterr().out
+
+    _main(monkeypatch, filename, "-o", output_filename, "--verbose", "--force")
+    assert "up-to-date" not in capsys.readouterr().out
+
+
+def test_session_update():
+    model = timeline.loads(TIMELINE)
+    session = timeline.TimelineSession(model)
+    assert set(session.artists) == {"Setup", "Season"}
+
+    model["Season"]["color"] = "red"
+    assert session.update(model) == {"Season"}
+    assert session.update(model) == set()
+
+    # Season starts after Setup
+    model["Setup"]["duration"] = "3 weeks"
+    assert session.update(model) == {"Setup", "Season"}
+    assert len(session.render("png")) > 0
+
+    model["Schedule"]["end"] = "04-01-2020"
+    assert session.update(model) == set(model)
+
+
+def test_week_numbers():
+    start = datetime.datetime(2019, 12, 20)
+    dates = [start + datetime.timedelta(days=i) for i in range(400)]
+    locations = np.array([mdates.date2num(d) for d in dates])
+
+    expected = [int(d.strftime("%W")) for d in dates]
+    assert timeline._week_numbers(locations).tolist() == expected
+
+
+def test_tick_grid():
+    vmin = mdates.date2num(datetime.datetime(2020, 1, 1))
+    vmax = mdates.date2num(datetime.datetime(2020, 3, 1))
+    grid = timeline.get_tick_grid("weeks", vmin, vmax)
+
+    assert timeline.get_tick_grid("weeks", vmin, vmax) is grid
+    assert len(grid.midpoints) == len(grid.locations) - 1
+    assert not grid.locations.flags.writeable
+
+
+def test_stage_timer():
+    calls = []
+    timer = timeline.StageTimer(hook=lambda *args: calls.append(args))
+    timeline.create_figure(timeline.loads(TIMELINE), timer=timer)
+
+    items = {stage: items for stage, elapsed, items in calls}
+    assert items["intervals"] == 2
+    assert items["events"] == 0
+    assert items["setup"] is None
+    assert timer.items["intervals"] == 2
+
+    # nested stages are reported separately and not added to the total
+    timer = timeline.StageTimer()
+    with timer("outer"):
+        with timer("inner", items=3):
+            pass
+    assert timer.nested == {"inner"}
+    f = io.StringIO()
+    timer.report(file=f)
+    top, total, _, _, inner = f.getvalue().splitlines()
+    assert total.split()[1] == top.split()[1]
+    assert inner.split()[-2:] == ["3", "items"]
+
+
+def test_load_cache(tmp_path):
+    filename = _write_timeline(tmp_path)
+    cache_dir = tmp_path / "cache"
+
+    model = timeline.load(filename, cache_dir=str(cache_dir))
+    assert timeline.load(filename, cache_dir=str(cache_dir)) == model
+
+    # a corrupt cache file is a cache miss
+    (cache_filename,) = cache_dir.iterdir()
+    cache_filename.write_bytes(b"\x80\x04garbage")
+    assert timeline.load(filename, cache_dir=str(cache_dir)) == model
+    assert timeline.load(filename, cache_dir=str(cache_dir)) == model
+
+
+def test_aware_dates():
+    model = timeline.loads("""\
+Schedule:
+  type: timeline
+  start: "2020-01-01T00:00:00Z"
+  end: "2020-03-01T00:00:00+00:00"
+
+Setup:
+  type: interval
+  start: "2020-01-06T02:00:00-08:00"
+  end: 01-20-2020
+
+Launch:
+  type: event
+  date: "2020-02-01T00:00:00Z"
+""")
+    assert len(timeline.render(model, format="png")) > 0
+
+    timeline.parse_dates(model)
+    assert model["Setup"]["start"] == datetime.datetime(2020, 1, 6, 10)
+
+
+def test_pack_lanes():
+    # three intervals overlap at the same time, so three lanes are needed
+    starts = np.array([0, 1, 2, 5, 6])
+    ends = np.array([4, 3, 7, 8, 9])
+    lanes, n_lanes = timeline.pack_lanes(starts, ends)
+    assert n_lanes == 3
+    for i in range(len(starts)):
+        for j in range(i):
+            if lanes[i] == lanes[j]:
+                assert ends[j] <= starts[i] or ends[i] <= starts[j]
+
+
+def test_pack_lanes_touching():
+    lanes, n_lanes = timeline.pack_lanes([0, 2, 4], [2, 4, 6])
+    assert n_lanes == 1
+    assert lanes.tolist() == [0, 0, 0]
+
+
+def test_pack_lanes_lowest_free_lane():
+    # lanes 0 and 1 are both free when the last interval starts, it takes lane 0
+    lanes, n_lanes = timeline.pack_lanes([0, 0, 0, 5], [2, 3, 10, 6])
+    assert n_lanes == 3
+    assert lanes.tolist() == [0, 1, 2, 0]
+
+
+def test_layout_lanes_fit(capsys):
+    lines = [TIMELINE.split("\n\n")[0], "  interval_location: auto"]
+    for i in range(300):
+        lines += [
+            f"Interval {i}:",
+            "  type: interval",
+            f"  start: 01-{1 + i % 28:02d}-2020",
+        ]
+        lines += ["  duration: 2 weeks"]
+    model = timeline.loads("\n".join(lines) + "\n")
+    timeline.parse_dates(model)
+    timeline.resolve_intervals(model)
+    coords = timeline.timeline_coords(model, "Schedule")
+
+    n_lanes = timeline.layout_lanes(model, coords)
+    locations = [model[n]["location"] for n in timeline._get_type(model, "interval")]
+    assert n_lanes > coords.lanes_top / coords.lane_height
+    assert min(locations) >= 0.0
+    assert max(locations) == coords.lanes_top
+    assert "do not fit" in capsys.readouterr().out
+
+
+def test_interval_index_overlapping():
+    def dates(*days):
+        return np.array(
+            [np.datetime64("2020-01-01", "us") + np.timedelta64(d, "D") for d in days]
+        )
+
+    index = timeline.IntervalIndex(
+        ["long", "a", "b", "c"], dates(0, 10, 12, 20), dates(30, 11, 15, 25)
+    )
+
+    def overlapping(start, end):
+        return index.overlapping(dates(start)[0], dates(end)[0])
+
+    # ranges touching an interval at either end overlap it
+    assert overlapping(11, 12) == ["long", "a", "b"]
+    assert overlapping(15, 20) == ["long", "b", "c"]
+    assert overlapping(16, 19) == ["long"]
+    assert overlapping(31, 40) == []
+    # the long interval starting well before the range is still found
+    assert overlapping(26, 26) == ["long"]
+
+
+def test_cull():
+    model = timeline.loads(TIMELINE + """
+Before:
+  type: interval
+  start: 11-01-2019
+  end: 12-01-2019
+
+Across:
+  type: interval
+  start: 12-01-2019
+  end: 01-15-2020
+
+Launch:
+  type: event
+  date: 04-01-2020
+
+Today:
+  type: vertical line
+  date: 02-01-2020
+""")
+    timeline.parse_dates(model)
+    timeline.resolve_intervals(model)
+    coords = timeline.timeline_coords(model, "Schedule")
+
+    assert timeline.cull(model, coords) == 2
+    assert "Before" not in model
+    assert "Launch" not in model
+    assert {"Setup", "Season", "Across", "Today"} <= set(model)
+
+
+def test_page_windows():
+    windows = timeline.page_windows(
+        datetime.datetime(2020, 1, 15), datetime.datetime(2020, 3, 1), "month"
+    )
+    assert [label for label, start, end in windows] == ["2020-01", "2020-02"]
+    assert windows[0][1:] == (
+        datetime.datetime(2020, 1, 1),
+        datetime.datetime(2020, 2, 1),
+    )
+
+    # a window starting before the end date is included
+    windows = timeline.page_windows(
+        datetime.datetime(2020, 11, 1), datetime.datetime(2021, 4, 2), "quarter"
+    )
+    assert [label for label, start, end in windows] == ["2020Q4", "2021Q1", "2021Q2"]
+    assert windows[-1][2] == datetime.datetime(2021, 7, 1)
+
+    # a single day gets a window
+    day = datetime.datetime(2020, 12, 1)
+    assert len(timeline.page_windows(day, day, "month")) == 1
+
+
+def test_write_pages(tmp_path):
+    model = timeline.loads(TIMELINE)
+
+    filename = str(tmp_path / "schedule.png")
+    filenames = timeline.write_pages(model, filename, "month", format="png")
+    assert [os.path.basename(f) for f in filenames] == [
+        "schedule-2020-01.png",
+        "schedule-2020-02.png",
+    ]
+    assert all(os.path.getsize(f) > 0 for f in filenames)
+
+    filename = str(tmp_path / "schedule.pdf")
+    assert timeline.write_pages(model, filename, "quarter") == [filename]
+    assert os.path.getsize(filename) > 0
+
+
+def _png_size(filename):
+    with open(filename, "rb") as f:
+        header = f.read(24)
+    return struct.unpack(">II", header[16:24])
+
+
+def test_main_formats(tmp_path, monkeypatch):
+    filename = _write_timeline(tmp_path)
+
+    # format from the -f option, output filename from the input filename
+    _main(monkeypatch, filename, "-f", "SVG")
+    with open(str(tmp_path / "schedule.svg"), "rb") as f:
+        assert b"<svg" in f.read()
+
+    # format from the output filename
+    png_filename = str(tmp_path / "schedule.png")
+    _main(monkeypatch, filename, "-o", png_filename, "--dpi", "50")
+    width, height = _png_size(png_filename)
+    _main(monkeypatch, filename, "-o", png_filename, "--dpi", "100")
+    assert _png_size(png_filename) == (2 * width, 2 * height)
+
+
+def test_write_figure_svg():
+    fig = timeline.create_figure(timeline.loads(TIMELINE))
+    canvas = fig.canvas
+
+    f = io.BytesIO()
+    timeline.write_figure(fig, f, format="svg")
+    assert b"<svg" in f.getvalue()
+    assert fig.canvas is canvas
+
+    f = io.BytesIO()
+    timeline.write_figure(fig, f, format="png")
+    assert f.getvalue().startswith(b"\x89PNG")
+
+
+def test_generate_namespace(tmp_path):
+    # the arguments of the original generate only
+    args = argparse.Namespace(verbose=False)
+    parser = argparse.ArgumentParser()
+    filename = str(tmp_path / "schedule.png")
+    timeline.generate(timeline.loads(TIMELINE), filename, args, parser)
+    assert _png_size(filename)[0] > 0
+
+    args = argparse.Namespace(verbose=False, page_by="month")
+    filename = str(tmp_path / "schedule.pdf")
+    timeline.generate(timeline.loads(TIMELINE), filename, args, parser)
+    assert os.path.getsize(filename) > 0
+
+
+def test_numbering_and_values():
+    model = timeline.loads(TIMELINE + """
+week numbers:
+  type: numbering
+  interval: weeks
+
+week count:
+  type: numbering
+  interval: weeks
+  initial_value: 5
+  alignment: left
+  position: bottom
+
+day count:
+  type: numbering
+  alignment: right
+
+load:
+  type: value
+  interval: weeks
+  value: low high low
+  location: 0.3
+""")
+    session = timeline.TimelineSession(model)
+    vmin, vmax = session.coords.ax.get_xlim()
+    weeks = timeline.get_tick_grid("weeks", vmin, vmax)
+    days = timeline.get_tick_grid("days", vmin, vmax)
+
+    def texts(name):
+        return [a.get_text() for a in session.artists[name]]
+
+    def xs(name):
+        return [a.get_position()[0] for a in session.artists[name]]
+
+    week_numbers = [
+        mdates.num2date(t).strftime("%W") for t in weeks.locations[:-1].tolist()
+    ]
+    assert texts("week numbers") == [str(int(w)) for w in week_numbers]
+    assert xs("week numbers") == weeks.midpoints.tolist()
+
+    n_weeks = len(weeks.locations) - 1
+    assert texts("week count") == [str(5 + i) for i in range(n_weeks)]
+    assert xs("week count") == weeks.locations[:-1].tolist()
+    assert session.artists["week count"][0].get_position()[1] < 0.0
+
+    n_days = len(days.locations) - 1
+    assert texts("day count") == [str(1 + i) for i in range(n_days)]
+    assert xs("day count") == days.locations[1:].tolist()
+
+    assert texts("load") == ["low", "high", "low"]
+    assert xs("load") == weeks.midpoints[:3].tolist()
+    assert {a.get_position()[1] for a in session.artists["load"]} == {0.3}
+
+
+def _resolve(text):
+    model = timeline.loads(text)
+    timeline.parse_dates(model)
+    timeline.resolve_intervals(model)
+    return model
+
+
+def test_resolve_intervals_time_of_day():
+    model = _resolve(
+        TIMELINE.replace("start: 01-06-2020", "start: 01-06-2020 13:30") + """
+Cleanup:
+  type: interval
+  start_after: Season
+  duration: 2 days
+"""
+    )
+    assert model["Setup"]["end"] == datetime.datetime(2020, 1, 20, 13, 30)
+    assert model["Season"]["start"] == datetime.datetime(2020, 1, 20, 13, 30)
+    assert model["Season"]["end"] == datetime.datetime(2020, 2, 10, 13, 30)
+    assert model["Cleanup"]["start"] == datetime.datetime(2020, 2, 10, 13, 30)
+    assert model["Cleanup"]["end"] == datetime.datetime(2020, 2, 12, 13, 30)
+
+
+def test_unquoted_dates():
+    model = _resolve(
+        TIMELINE.replace("01-01-2020", "2020-01-01").replace(
+            "start: 01-06-2020", "start: 2020-01-06"
+        )
+    )
+    assert model["Schedule"]["start"] == datetime.datetime(2020, 1, 1)
+    assert model["Setup"]["start"] == datetime.datetime(2020, 1, 6)
+    assert model["Season"]["end"] == datetime.datetime(2020, 2, 10)
+
+
+def test_resolve_intervals_invalid():
+    circular = """\
+First:
+  type: interval
+  start_after: Second
+  duration: 1 week
+
+Second:
+  type: interval
+  start_after: First
+  duration: 1 week
+"""
+    with pytest.raises(timeline.ParsingError, match="circular.*First, Second"):
+        _resolve(circular)
+
+    no_start = """\
+Lonely:
+  type: interval
+  duration: 1 week
+"""
+    with pytest.raises(timeline.ParsingError, match="undefined start.*Lonely"):
+        _resolve(no_start)
+
+    with pytest.raises(timeline.ParsingError, match="unknown interval 'Missing'"):
+        _resolve(TIMELINE.replace("start_after: Setup", "start_after: Missing"))
+
+
+LOD_TIMELINE = """\
+Schedule:
+  type: timeline
+  start: 01-01-2020
+  end: 03-01-2020
+  level_of_detail: true
+"""
+
+
+def _level_of_detail(text):
+    model = _resolve(LOD_TIMELINE + text)
+    timeline.level_of_detail(model, timeline.timeline_coords(model, "Schedule"))
+    return model
+
+
+def test_level_of_detail_merge():
+    model = _level_of_detail("""
+First:
+  type: interval
+  start: 01-10-2020 00:00
+  end: 01-10-2020 00:01
+  color: red
+
+Second:
+  type: interval
+  start: 01-10-2020 00:02
+  end: 01-10-2020 00:03
+  color: red
+
+Other color:
+  type: interval
+  start: 01-10-2020 00:04
+  end: 01-10-2020 00:05
+  color: blue
+
+Wide:
+  type: interval
+  start: 02-01-2020
+  duration: 1 week
+  color: red
+""")
+    assert list(model) == ["Schedule", "First", "Other color", "Wide"]
+    assert model["First"]["end"] == datetime.datetime(2020, 1, 10, 0, 3)
+    assert model["First"]["label"] is False
+    assert model["Other color"]["label"] is False
+    assert "label" not in model["Wide"]
+
+
+def test_level_of_detail_labels():
+    model = _level_of_detail("""
+Short:
+  type: interval
+  start: 01-12-2020
+  end: 01-18-2020
+
+Long:
+  type: interval
+  start: 01-05-2020
+  end: 01-25-2020
+""")
+    assert model["Short"]["label"] is False
+    assert "label" not in model["Long"]
+
+    twins = """
+Twin {}:
+  type: interval
+  start: 02-01-2020
+  end: 02-10-2020
+"""
+    model = _level_of_detail(twins.format("A") + twins.format("B"))
+    assert "label" not in model["Twin A"]
+    assert model["Twin B"]["label"] is False
+
+    model = _level_of_detail(twins.format("B") + twins.format("A"))
+    assert "label" not in model["Twin B"]
+    assert model["Twin A"]["label"] is False
+
+    # hidden labels do not collide with others
+    model = _level_of_detail(twins.format("B") + "  label: false\n" + twins.format("A"))
+    assert "label" not in model["Twin A"]